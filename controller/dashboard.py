@@ -9,6 +9,7 @@ from flask import send_from_directory, send_file, url_for
 from utils.core import APP_DIR, mukkuru_env
 from utils.core import get_config, backend_log, set_alive_status
 from utils.bootstrap import build_file_tree, get_userprofile_folder
+from library.image_variants import image_pipeline
 
 dashboard_blueprint = Blueprint('library', __name__)
 
@@ -17,7 +18,9 @@ def server_file(path: str):
     ''' returns dashboard static files '''
     serve_path = os.path.join(APP_DIR, "ui")
     if path.startswith("thumbnails/") or path.startswith("hero/"):
-        return send_from_directory(mukkuru_env["root"], path, mimetype='image/jpeg')
+        accepts_webp = "image/webp" in request.headers.get("Accept", "")
+        path, mimetype = image_pipeline.resolve(path, accepts_webp)
+        return send_from_directory(mukkuru_env["root"], path, mimetype=mimetype)
     if path == "dashboard":
         path = "dashboard.html"
     return send_from_directory(serve_path, path)
@@ -0,0 +1,30 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' background jobs controller module '''
+from flask import Blueprint, jsonify
+from utils.jobs import jobs, DONE
+
+jobs_blueprint = Blueprint('jobs', __name__)
+
+@jobs_blueprint.route("/jobs")
+def list_jobs():
+    ''' returns active and recently finished jobs, newest first '''
+    return jsonify(jobs.list())
+
+@jobs_blueprint.route("/jobs/<int:job_id>")
+def get_job(job_id: int):
+    ''' returns the status of a job, and its result once done '''
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error" : f"job {job_id} does not exist"}), 404
+    status = job.to_dict()
+    if job.status == DONE:
+        status["result"] = job.result
+    return jsonify(status)
+
+@jobs_blueprint.route("/jobs/<int:job_id>/cancel", methods = ['POST'])
+def cancel_job(job_id: int):
+    ''' requests cancellation of a queued or running job '''
+    if not jobs.cancel(job_id):
+        return jsonify({"error" : f"job {job_id} is not active"}), 404
+    return jsonify(jobs.get(job_id).to_dict())
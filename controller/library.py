@@ -6,10 +6,18 @@ from flask import Blueprint, jsonify, request
 from flask import send_from_directory
 from library.steam import get_proton_list
 from library.games import get_games, scan_games, scan_artwork
-from library.games import launch_app, get_username, list_stores
+from library.games import launch_app, get_username, list_stores, scan_stats
+from library.games import apply_launch_options, artwork_queue
+from library.playtime import playtime_index
+from library.artwork_index import artwork_index
+from library.launch_manager import launch_manager
+from library.library_query import query_library
+from library.search_index import search_index
+from library.library_store import library_store
 from library import video
 from utils.core import get_config, mukkuru_env
 from utils import expansion
+from utils.jobs import jobs
 
 library_controller = Blueprint('library', __name__)
 external_library = Blueprint('external_library', __name__)
@@ -28,21 +36,105 @@ def add_game():
 
 @library_controller.route('/library/scan')
 def scan_games_controller():
-    ''' http controller for library.games scan_games()  '''
-    games = scan_games()
-    return jsonify(games)
+    ''' starts a library scan and returns its job, concurrent requests share one scan '''
+    job = jobs.submit("library_scan", scan_games, key="library_scan", context="Library scan")
+    return jsonify(job.to_dict()), 202
+
+@library_controller.route('/library/scan/stats')
+def scan_stats_controller():
+    ''' returns statistics of the last library scan '''
+    return jsonify(scan_stats)
 
 @library_controller.route('/library/artwork/scan')
 def scan_artwork_controller():
-    ''' calls artwork scan '''
-    scan_artwork()
-    return "200"
+    ''' starts an artwork scan, returns its job '''
+    job = jobs.submit("artwork_scan", scan_artwork, key="artwork_scan", context="Artwork scan")
+    return jsonify(job.to_dict()), 202
+@library_controller.route('/library/artwork/queue')
+def artwork_queue_controller():
+    ''' returns artwork queue counters '''
+    return jsonify(artwork_queue.stats())
+
+@library_controller.route('/library/artwork/missing')
+def missing_artwork_controller():
+    ''' returns app ids missing each artwork type '''
+    return jsonify(artwork_index.missing(get_games()))
+
 @external_library.route('/library/apps')
 @library_controller.route('/library/get')
 def get_games_controller():
-    ''' calls get_games '''
+    ''' calls get_games, library version is sent in headers for /library/changes '''
+    version = library_store.version
     games = get_games()
-    return jsonify(games)
+    response = jsonify(games)
+    response.headers["X-Library-Version"] = str(version)
+    response.headers["X-Library-Epoch"] = library_store.epoch
+    return response
+
+@external_library.route('/library/changes')
+@library_controller.route('/library/changes')
+def library_changes_controller():
+    ''' returns library entries changed after ?since=version, or tells the client to reload '''
+    try:
+        since = int(request.args.get("since", 0))
+    except ValueError:
+        return jsonify({"error" : "since must be a number"}), 400
+    return jsonify(library_store.changes(since, request.args.get("epoch")))
+
+def query_flag(name: str, default=None):
+    ''' reads a true/false query parameter, "any" disables the filter '''
+    value = request.args.get(name)
+    if value is None:
+        return default
+    value = value.lower()
+    if value == "any":
+        return None
+    return value in ("true", "1", "yes")
+
+@external_library.route('/library/query')
+@library_controller.route('/library/query')
+def query_library_controller():
+    '''
+    returns a page of the library, with the library version headers of /library/get
+    ?sort=name|recent|playtime|source|relevance|home&source=&favorite=&hidden=&art=&q=
+    &offset=&limit=
+    '''
+    user_config = get_config()
+    has_art = query_flag("art")
+    if has_art is None and user_config["skipNoArt"]:
+        has_art = True
+    version = library_store.version
+    try:
+        page = query_library(user_config,
+                             sort=request.args.get("sort", "name"),
+                             source=request.args.get("source"),
+                             favorite=query_flag("favorite"),
+                             hidden=query_flag("hidden", False),
+                             has_art=has_art,
+                             term=request.args.get("q"),
+                             offset=int(request.args.get("offset", 0)),
+                             limit=int(request.args.get("limit", 100)))
+    except ValueError as e:
+        return jsonify({"error" : str(e)}), 400
+    response = jsonify(page)
+    response.headers["X-Library-Version"] = str(version)
+    response.headers["X-Library-Epoch"] = library_store.epoch
+    return response
+
+@external_library.route('/library/search')
+@library_controller.route('/library/search')
+def search_library_controller():
+    ''' returns [[app_id, score]] of games matching ?q=, best match first '''
+    try:
+        limit = int(request.args.get("limit", 50))
+    except ValueError:
+        return jsonify({"error" : "limit must be a number"}), 400
+    return jsonify(search_index.search(request.args.get("q", ""), limit=limit))
+
+@library_controller.route('/library/playtime')
+def get_playtime_controller():
+    ''' returns steam playtime and last played date of every app '''
+    return jsonify(playtime_index.get())
 
 @library_controller.route('/library/lossless_scaling/<app_id>', methods = ['POST', 'DELETE'])
 def toggle_lossless_scaling_controller(app_id):
@@ -50,13 +142,49 @@ def toggle_lossless_scaling_controller(app_id):
     expansion.toggle_lossless_scaling_for_game(app_id, request.method == 'POST')
     return jsonify(200)
 
+@library_controller.route('/library/lossless_scaling', methods = ['POST', 'DELETE'])
+def toggle_lossless_scaling_batch_controller():
+    ''' calls toggle_lossless_scaling_for_games with a json list of app ids '''
+    appids = request.get_json(silent=True)
+    if not isinstance(appids, list) or not all(isinstance(appid, str) for appid in appids):
+        return jsonify({"error" : "body must be a json list of app ids"}), 400
+    results = expansion.toggle_lossless_scaling_for_games(appids, request.method == 'POST')
+    return jsonify(results)
+
+@library_controller.route('/library/launch_options', methods = ['POST'])
+def set_launch_options_controller():
+    ''' applies a json map of app id to launch options '''
+    launch_options = request.get_json(silent=True)
+    if not isinstance(launch_options, dict) or \
+            not all(isinstance(options, str) for options in launch_options.values()):
+        return jsonify({"error" : "body must be a json map of app id to launch options"}), 400
+    return jsonify(apply_launch_options(launch_options))
+
 @external_library.route('/library/launch/<app_id>')
 @library_controller.route('/library/launch/<app_id>')
 def launch_app_controller(app_id):
     ''' executes library.games.launch_app, returns 200 '''
-    launch_app(app_id)
+    if not launch_app(app_id):
+        return jsonify({"error" : f"{app_id} can not be launched by the current steam user"}), 409
     return "200"
 
+@library_controller.route('/library/running')
+def running_games_controller():
+    ''' returns games launched by Mukkuru that are still running '''
+    return jsonify(launch_manager.running())
+
+@library_controller.route('/library/stop/<app_id>', methods = ['POST'])
+def stop_game_controller(app_id):
+    ''' terminates a running game '''
+    if not launch_manager.stop(app_id):
+        return jsonify({"error" : f"{app_id} is not running"}), 404
+    return jsonify(200)
+
+@library_controller.route('/library/sessions/<app_id>')
+def game_sessions_controller(app_id):
+    ''' returns recorded play sessions of a game '''
+    return jsonify(launch_manager.get_sessions(app_id))
+
 @library_controller.route('/username')
 def get_username_controller():
     ''' Gets username '''
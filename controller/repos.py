@@ -1,9 +1,9 @@
 # Copyright (c) 2025 b1on1cdog
 # Licensed under the MIT License
 ''' repos controller module '''
-import threading
 from flask import Blueprint, jsonify
 from utils import expansion
+from utils.jobs import jobs
 
 repos_blueprint = Blueprint('repos', __name__)
 
@@ -22,7 +22,6 @@ def get_packages():
 @repos_blueprint.route("/repos/patches/<appid>/<patch_index>", methods = ['POST'])
 def install_patch(appid, patch_index):
     ''' expansion.install_patch_from_index controller '''
-    thread = threading.Thread(target=expansion.install_patch_from_index,
-                     args=(appid, patch_index))
-    thread.start()
+    jobs.submit("patch", expansion.install_patch_from_index, appid, patch_index,
+                key=f"patch_{appid}")
     return jsonify("OK", 200)
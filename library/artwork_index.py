@@ -0,0 +1,102 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Index of downloaded artwork, built from a single scan of each artwork folder '''
+import os
+import threading
+from utils.core import mukkuru_env
+
+# library flag -> (artwork folder, file extension)
+# Hero and Logo already hold steam cache paths, so their flags use other names
+ASSETS = {
+    "Thumbnail" : ("thumbnails", ".jpg"),
+    "HeroArt" : ("hero", ".png"),
+    "LogoArt" : ("logo", ".png"),
+}
+
+def asset_path(app_id: str, flag: str) -> str:
+    ''' path where the asset of a game is stored '''
+    folder, extension = ASSETS[flag]
+    return os.path.join(mukkuru_env["root"], folder, f"{app_id}{extension}")
+
+def scan_folder(folder: str, extension: str) -> set:
+    ''' app ids of every asset in folder '''
+    app_ids = set()
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.name.endswith(extension) and entry.is_file():
+                    app_ids.add(entry.name[:-len(extension)])
+    except (FileNotFoundError, NotADirectoryError):
+        pass
+    return app_ids
+
+class ArtworkIndex:
+    ''' Keeps app ids with artwork in memory, downloads update it one file at a time '''
+    def __init__(self):
+        self.assets = {flag : set() for flag in ASSETS}
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def refresh(self) -> None:
+        ''' rebuilds the index with one directory scan per asset type '''
+        assets = {}
+        for flag, (folder, extension) in ASSETS.items():
+            assets[flag] = scan_folder(os.path.join(mukkuru_env["root"], folder), extension)
+        with self.lock:
+            self.assets = assets
+            self.loaded = True
+
+    def _ensure_loaded(self) -> None:
+        if not self.loaded:
+            self.refresh()
+
+    def has(self, app_id: str, flag: str) -> bool:
+        ''' returns whether the asset of a game is downloaded '''
+        self._ensure_loaded()
+        with self.lock:
+            return app_id in self.assets[flag]
+
+    def check(self, app_id: str, flag: str) -> bool:
+        ''' re-checks a single asset, ex: after a download finished '''
+        self._ensure_loaded()
+        exists = os.path.isfile(asset_path(app_id, flag))
+        with self.lock:
+            if exists:
+                self.assets[flag].add(app_id)
+            else:
+                self.assets[flag].discard(app_id)
+        return exists
+
+    def apply(self, games: dict) -> tuple:
+        '''
+        returns (games, changed), entries whose flags changed are copied,
+        unchanged entries and games itself are left untouched
+        '''
+        self._ensure_loaded()
+        with self.lock:
+            assets = {flag : app_ids.copy() for flag, app_ids in self.assets.items()}
+        updated = {}
+        changed = False
+        for app_id, game in games.items():
+            flags = {flag : app_id in app_ids for flag, app_ids in assets.items()}
+            if all(game.get(flag) is value for flag, value in flags.items()):
+                updated[app_id] = game
+                continue
+            updated[app_id] = {**game, **flags}
+            changed = True
+        return updated, changed
+
+    def downloaded(self) -> dict:
+        ''' returns {flag: app ids} of every downloaded asset '''
+        self._ensure_loaded()
+        with self.lock:
+            return {flag : app_ids.copy() for flag, app_ids in self.assets.items()}
+
+    def missing(self, games: dict) -> dict:
+        ''' returns {flag: [app ids]} of games without each asset type '''
+        self._ensure_loaded()
+        with self.lock:
+            return {flag : [app_id for app_id in games if app_id not in app_ids]
+                    for flag, app_ids in self.assets.items()}
+
+artwork_index = ArtworkIndex()
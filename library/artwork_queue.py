@@ -0,0 +1,110 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Per game artwork work queue, served by a pool of worker threads '''
+import queue
+import threading
+from typing import Optional
+from utils.core import backend_log
+
+# processed items between two on_batch calls
+BATCH_SIZE = 12
+
+class ArtworkQueue:
+    '''
+    Holds one work item per game, games already queued or being processed
+    are not queued again. on_batch(idle) runs every BATCH_SIZE items and once
+    the queue is drained, with idle set. Dropped games are skipped, in flight
+    ones are expected to check is_dropped() between downloads.
+    '''
+    def __init__(self, batch_size: int = BATCH_SIZE):
+        self.batch_size = batch_size
+        self.items = queue.Queue()
+        # queued or in flight
+        self.pending = set()
+        self.in_flight = set()
+        self.dropped = set()
+        self.processed = 0
+        self.handler = None
+        self.on_batch = None
+        self.workers = []
+        self.lock = threading.Lock()
+        # notified whenever an item leaves the queue
+        self.changed = threading.Condition(self.lock)
+
+    def start(self, handler, workers: int, on_batch=None) -> None:
+        ''' starts workers calling handler(app_id, game) for each item '''
+        with self.lock:
+            self.handler = handler
+            self.on_batch = on_batch
+            for _ in range(max(1, workers) - len(self.workers)):
+                worker = threading.Thread(target=self._work, daemon=True)
+                worker.start()
+                self.workers.append(worker)
+
+    def put(self, app_id: str, game: dict) -> bool:
+        ''' queues a game, returns False if it is already queued or in flight '''
+        with self.lock:
+            if app_id in self.dropped:
+                # queued again before a worker skipped it
+                self.dropped.discard(app_id)
+                return True
+            if app_id in self.pending:
+                return False
+            self.pending.add(app_id)
+        self.items.put((app_id, game))
+        return True
+
+    def drop(self, app_ids) -> None:
+        ''' skips queued games, games in flight stop before their next download '''
+        with self.lock:
+            self.dropped.update(app_id for app_id in app_ids if app_id in self.pending)
+
+    def is_dropped(self, app_id: str) -> bool:
+        ''' returns whether the work item of app_id was dropped '''
+        with self.lock:
+            return app_id in self.dropped
+
+    def wait(self, app_ids: set, timeout: Optional[float] = None) -> set:
+        ''' waits up to timeout for app_ids to leave the queue, returns those still pending '''
+        with self.changed:
+            self.changed.wait_for(lambda: not self.pending & app_ids, timeout)
+            return self.pending & app_ids
+
+    def _work(self) -> None:
+        while True:
+            app_id, game = self.items.get()
+            with self.lock:
+                skip = app_id in self.dropped
+                if not skip:
+                    self.in_flight.add(app_id)
+            try:
+                if not skip:
+                    self.handler(app_id, game)
+            except Exception as e:#pylint: disable=W0718
+                # any failure would kill the worker and leave its app id pending forever
+                backend_log(f"artwork error for {app_id}: {e}")
+            finally:
+                with self.lock:
+                    self.in_flight.discard(app_id)
+                    self.pending.discard(app_id)
+                    self.dropped.discard(app_id)
+                    self.processed += 1
+                    self.changed.notify_all()
+                    idle = not self.pending
+                    batch = idle or self.processed % self.batch_size == 0
+                self.items.task_done()
+            if batch and self.on_batch is not None:
+                try:
+                    self.on_batch(idle)
+                except Exception as e:#pylint: disable=W0718
+                    backend_log(f"artwork batch callback failed: {e}")
+
+    def stats(self) -> dict:
+        ''' returns queued, in flight and processed item counts '''
+        with self.lock:
+            return {
+                "queued" : len(self.pending) - len(self.in_flight),
+                "inFlight" : len(self.in_flight),
+                "processed" : self.processed,
+                "workers" : len(self.workers),
+            }
@@ -0,0 +1,86 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Artwork SteamGridDB did not have, retried once its entry expires '''
+import time
+from typing import Optional
+from utils.json_store import JsonStore, SAVE_DELAY
+from library.artwork_index import ASSETS
+
+# seconds before missing artwork is looked up again, it may have been uploaded since
+RETRY_AFTER = 7 * 24 * 3600
+# config lists that used to hold missing artwork, per artwork flag
+LEGACY_BLACKLISTS = {
+    "Thumbnail" : "boxartBlacklist",
+    "HeroArt" : "heroBlacklist",
+    "LogoArt" : "logoBlacklist",
+}
+
+class ArtworkStatus(JsonStore):
+    ''' Keeps {flag: {app id: time reported missing}} in artwork_status.json '''
+    file_version = 1
+    field = "missing"
+    env_key = "artwork_status.json"
+    name = "artwork status"
+
+    def __init__(self, path: Optional[str] = None, retry_after: float = RETRY_AFTER,
+                 delay: float = SAVE_DELAY):
+        super().__init__(path, delay)
+        self.retry_after = retry_after
+        self.missing = None
+
+    def _load(self) -> None:
+        self.missing = {flag : {} for flag in ASSETS}
+        for flag, entries in (self._read() or {}).items():
+            if flag in self.missing:
+                self.missing[flag] = entries
+
+    def is_missing(self, app_id: str, flag: str) -> bool:
+        ''' returns whether the asset was reported missing and should not be looked up yet '''
+        with self.lock:
+            if self.missing is None:
+                self._load()
+            reported = self.missing[flag].get(app_id)
+            return reported is not None and time.time() - reported < self.retry_after
+
+    def mark_missing(self, app_id: str, flag: str) -> None:
+        ''' records an asset SteamGridDB does not have '''
+        with self.lock:
+            if self.missing is None:
+                self._load()
+            self.missing[flag][app_id] = time.time()
+            self._changed()
+
+    def clear(self) -> None:
+        ''' forgets every missing asset, they are looked up on the next scan '''
+        with self.lock:
+            self.missing = {flag : {} for flag in ASSETS}
+            self._changed()
+
+    def migrate(self, user_config: dict) -> bool:
+        '''
+        moves missing artwork lists out of config, they are retried after
+        RETRY_AFTER like any new entry. Returns whether user_config changed.
+        '''
+        legacy = {flag : user_config.pop(key) for flag, key in LEGACY_BLACKLISTS.items()
+                  if key in user_config}
+        if not legacy:
+            return False
+        now = time.time()
+        with self.lock:
+            if self.missing is None:
+                self._load()
+            for flag, app_ids in legacy.items():
+                for app_id in app_ids:
+                    self.missing[flag].setdefault(app_id, now)
+            self._changed()
+        return True
+
+    def _dump(self) -> dict:
+        ''' expired entries are dropped '''
+        now = time.time()
+        self.missing = {flag : {app_id : reported for app_id, reported in entries.items()
+                                if now - reported < self.retry_after}
+                        for flag, entries in self.missing.items()}
+        return {flag : entries.copy() for flag, entries in self.missing.items()}
+
+artwork_status = ArtworkStatus()
@@ -1,94 +1,343 @@
 # Copyright (c) 2025 b1on1cdog
 # Licensed under the MIT License
 ''' Library for parsing valve data files (vdf) '''
+import mmap
 import struct
+from typing import Iterator, Optional
+from utils.core import atomic_write
 
-class BinaryVDFParser:
-    ''' Class used to parse VDF files '''
-    def __init__(self, file):
-        self.file = file
+UINT32 = struct.Struct("<I")
+INT32 = struct.Struct("<i")
+UINT64 = struct.Struct("<Q")
+INT64 = struct.Struct("<q")
+FLOAT32 = struct.Struct("<f")
 
-    def _read_uint32(self):
-        return struct.unpack("<I", self.file.read(4))[0]
+TYPE_MAP = 0x00
+TYPE_STRING = 0x01
+TYPE_INT32 = 0x02
+TYPE_FLOAT32 = 0x03
+TYPE_POINTER = 0x04
+TYPE_WIDESTRING = 0x05
+TYPE_COLOR = 0x06
+TYPE_UINT64 = 0x07
+TYPE_END = 0x08
+TYPE_INT64 = 0x0A
+TYPE_END_ALT = 0x0B
+END_MARKERS = (TYPE_END, TYPE_END_ALT)
 
-    def _read_uint64(self):
-        return struct.unpack("<Q", self.file.read(8))[0]
+# Values of these types are returned wrapped so they are written back with
+# their original type, they compare and serialize like the builtin types
+class Pointer(int):
+    ''' 0x04 pointer value '''
 
-    def _read_string(self):
-        chars = []
-        while True:
-            byte = self.file.read(1)
-            if byte == b'\x00' or byte == b'':
-                break
-            chars.append(byte)
-        return b''.join(chars).decode("utf-8", errors="replace")
+class Color(int):
+    ''' 0x06 color value '''
 
-    def _read_entry(self):
-        entry_type = self.file.read(1)
-        if not entry_type or entry_type == b'\x08':  # end marker
-            return None, None, True
+class UInt64(int):
+    ''' 0x07 unsigned 64 bit integer '''
 
-        name = self._read_string()
+class Int64(int):
+    ''' 0x0A signed 64 bit integer '''
 
-        if entry_type == b'\x00':  # nested dictionary
-            value = self._read_dict()
-        elif entry_type == b'\x01':  # string
-            value = self._read_string()
-        elif entry_type == b'\x02':  # uint32
-            value = self._read_uint32()
-        elif entry_type == b'\x07':  # uint64
-            value = self._read_uint64()
-        else:
-            raise ValueError(f"Unknown type: {entry_type}")
+class WideString(str):
+    ''' 0x05 UTF-16 string '''
 
-        return name, value, False
+class BinaryVDFParser:
+    ''' Class used to parse VDF files '''
+    def __init__(self, file):
+        self.file = file
+        self.data = b''
+        self.offset = 0
+        # end marker of the last parsed file, written back by dump_bytes
+        self.end_marker = TYPE_END
 
     def _read_dict(self):
+        # Walks the buffer with offsets, nested dictionaries are kept in a
+        # stack instead of recursion since this loop runs for every key
+        data = self.data
+        size = len(data)
+        find = data.find
+        offset = self.offset
         result = {}
+        stack = []
         while True:
-            name, value, done = self._read_entry()
-            if done:
-                break
-            result[name] = value
+            if offset >= size:
+                entry_type = TYPE_END
+            else:
+                entry_type = data[offset]
+                offset += 1
+            if entry_type in END_MARKERS:
+                if not stack:
+                    self.end_marker = entry_type
+                    break
+                result = stack.pop()
+                continue
+            end = find(b'\x00', offset)
+            if end == -1:
+                end = size
+            name = data[offset:end].decode("utf-8", errors="replace")
+            offset = end + 1
+            if entry_type == TYPE_MAP:  # nested dictionary
+                nested = {}
+                result[name] = nested
+                stack.append(result)
+                result = nested
+            elif entry_type == TYPE_STRING:  # string
+                end = find(b'\x00', offset)
+                if end == -1:
+                    end = size
+                result[name] = data[offset:end].decode("utf-8", errors="replace")
+                offset = end + 1
+            elif entry_type == TYPE_INT32:  # uint32
+                result[name] = UINT32.unpack_from(data, offset)[0]
+                offset += 4
+            elif entry_type == TYPE_UINT64:  # uint64
+                result[name] = UInt64(UINT64.unpack_from(data, offset)[0])
+                offset += 8
+            else:
+                result[name], offset = self._read_value(data, offset, entry_type)
+        self.offset = offset
         return result
 
+    def _read_value(self, data, offset: int, entry_type: int) -> tuple:
+        ''' reads a value of the less common types, returns it and the next offset '''
+        if entry_type == TYPE_FLOAT32:
+            return FLOAT32.unpack_from(data, offset)[0], offset + 4
+        if entry_type == TYPE_POINTER:
+            return Pointer(UINT32.unpack_from(data, offset)[0]), offset + 4
+        if entry_type == TYPE_COLOR:
+            return Color(UINT32.unpack_from(data, offset)[0]), offset + 4
+        if entry_type == TYPE_INT64:
+            return Int64(INT64.unpack_from(data, offset)[0]), offset + 8
+        if entry_type == TYPE_WIDESTRING:
+            end = self._find_wide_end(data, offset)
+            value = data[offset:end].decode("utf-16-le", errors="replace")
+            return WideString(value), end + 2
+        raise ValueError(f"Unknown type: {bytes([entry_type])}")
+
+    def _find_wide_end(self, data, offset: int) -> int:
+        ''' finds the 2 byte terminator of a UTF-16 string '''
+        end = data.find(b'\x00\x00', offset)
+        while end != -1 and (end - offset) % 2:
+            end = data.find(b'\x00\x00', end + 1)
+        return len(data) if end == -1 else end
+
+    def parse_bytes(self, data: bytes):
+        ''' parses a vdf shortcut already loaded in memory '''
+        self.data = data
+        self.offset = 0
+        return self._read_dict()
+
     def parse_shortcut(self, path: str):
         ''' parses a vdf shortcut '''
         with open(path, "rb") as f:
-            self.file = f
-            return self._read_dict()
-
-    def _write_string(self, s: str):
-        self.file.write(s.encode('utf-8') + b'\x00')
-
-    def _write_entry(self, key: str, value):
-        if isinstance(value, dict):
-            self.file.write(b'\x00')  # nested dict
-            self._write_string(key)
-            self._write_dict(value)
-        elif isinstance(value, str):
-            self.file.write(b'\x01')  # string
-            self._write_string(key)
-            self._write_string(value)
-        elif isinstance(value, int):
-            if value <= 0xFFFFFFFF:
-                self.file.write(b'\x02')  # uint32
-                self._write_string(key)
-                self.file.write(struct.pack("<I", value))
+            return self.parse_bytes(f.read())
+
+    def _skip_value(self, data, offset: int, entry_type: int) -> int:
+        ''' returns the offset right after a value, without decoding it '''
+        if entry_type == TYPE_STRING:  # string
+            end = data.find(b'\x00', offset)
+            return len(data) if end == -1 else end + 1
+        if entry_type == TYPE_INT32:  # uint32
+            return offset + 4
+        if entry_type in (TYPE_FLOAT32, TYPE_POINTER, TYPE_COLOR):
+            return offset + 4
+        if entry_type in (TYPE_UINT64, TYPE_INT64):
+            return offset + 8
+        if entry_type == TYPE_WIDESTRING:
+            return self._find_wide_end(data, offset) + 2
+        if entry_type != TYPE_MAP:
+            raise ValueError(f"Unknown type: {bytes([entry_type])}")
+        depth = 1
+        size = len(data)
+        while depth > 0 and offset < size:
+            entry_type = data[offset]
+            offset += 1
+            if entry_type in END_MARKERS:
+                depth -= 1
+                continue
+            end = data.find(b'\x00', offset)
+            offset = size if end == -1 else end + 1
+            if entry_type == TYPE_MAP:
+                depth += 1
+            else:
+                offset = self._skip_value(data, offset, entry_type)
+        return offset
+
+    def _read_name(self, data, offset: int) -> tuple:
+        ''' returns raw name bytes and the offset after its terminator '''
+        end = data.find(b'\x00', offset)
+        if end == -1:
+            end = len(data)
+        return data[offset:end], end + 1
+
+    def _read_fields(self, data, offset: int, wanted: Optional[dict]) -> tuple:
+        '''
+        reads the map starting at offset, decoding only names in wanted
+        (every name when None), returns the map and the offset after it
+        '''
+        size = len(data)
+        find = data.find
+        result = {}
+        while offset < size:
+            entry_type = data[offset]
+            offset += 1
+            if entry_type in END_MARKERS:
+                break
+            end = find(b'\x00', offset)
+            if end == -1:
+                end = size
+            raw_name = data[offset:end]
+            offset = end + 1
+            if wanted is None:
+                name = raw_name.decode("utf-8", errors="replace")
+            elif raw_name in wanted:
+                name = wanted[raw_name]
+            elif entry_type == TYPE_STRING:  # skipped string, most common case
+                end = find(b'\x00', offset)
+                offset = size if end == -1 else end + 1
+                continue
+            else:
+                offset = self._skip_value(data, offset, entry_type)
+                continue
+            if entry_type == TYPE_MAP:
+                self.data = data
+                self.offset = offset
+                result[name] = self._read_dict()
+                offset = self.offset
+            elif entry_type == TYPE_STRING:
+                end = find(b'\x00', offset)
+                if end == -1:
+                    end = size
+                result[name] = data[offset:end].decode("utf-8", errors="replace")
+                offset = end + 1
+            elif entry_type == TYPE_INT32:
+                result[name] = UINT32.unpack_from(data, offset)[0]
+                offset += 4
+            elif entry_type == TYPE_UINT64:
+                result[name] = UInt64(UINT64.unpack_from(data, offset)[0])
+                offset += 8
             else:
-                self.file.write(b'\x07')  # uint64
-                self._write_string(key)
-                self.file.write(struct.pack("<Q", value))
-        else:
-            raise TypeError(f"Unsupported value type for key '{key}': {type(value)}")
+                result[name], offset = self._read_value(data, offset, entry_type)
+        return result, offset
 
-    def _write_dict(self, d: dict):
+    def _iter_entries(self, data, offset: int, wanted: Optional[dict]) -> Iterator[tuple]:
+        ''' yields (index, fields) for every map inside the map at offset '''
+        size = len(data)
+        while offset < size:
+            entry_type = data[offset]
+            offset += 1
+            if entry_type in END_MARKERS:
+                return
+            raw_index, offset = self._read_name(data, offset)
+            if entry_type != TYPE_MAP:
+                offset = self._skip_value(data, offset, entry_type)
+                continue
+            shortcut, offset = self._read_fields(data, offset, wanted)
+            yield raw_index.decode("utf-8", errors="replace"), shortcut
+
+    def iter_shortcuts(self, path: str, fields: Optional[set] = None) -> Iterator[tuple]:
+        '''
+        yields (index, shortcut) one shortcut at a time, decoding only the keys
+        in fields (every key when None). The file is memory mapped, so memory
+        usage does not grow with its size.
+        '''
+        wanted = None
+        if fields is not None:
+            wanted = {field.encode('utf-8') : field for field in fields}
+        with open(path, "rb") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                return
+            try:
+                offset = 0
+                size = len(data)
+                while offset < size:
+                    entry_type = data[offset]
+                    offset += 1
+                    if entry_type in END_MARKERS:
+                        break
+                    raw_name, offset = self._read_name(data, offset)
+                    if entry_type == TYPE_MAP and raw_name == b"shortcuts":
+                        yield from self._iter_entries(data, offset, wanted)
+                        break
+                    offset = self._skip_value(data, offset, entry_type)
+            finally:
+                self.data = b''
+                data.close()
+
+    def _write_dict(self, buffer: bytearray, d: dict, end_marker: int):
         for key, value in d.items():
-            self._write_entry(key, value)
-        self.file.write(b'\x08')  # end of dict marker
+            name = key.encode('utf-8') + b'\x00'
+            value_type = type(value)
+            # exact builtin types first, they are most of a shortcuts file
+            if value_type is str:
+                buffer.append(TYPE_STRING)
+                buffer += name
+                buffer += value.encode('utf-8') + b'\x00'
+            elif value_type is int and 0 <= value <= 0xFFFFFFFF:
+                buffer.append(TYPE_INT32)
+                buffer += name
+                buffer += UINT32.pack(value)
+            elif isinstance(value, dict):
+                buffer.append(TYPE_MAP)
+                buffer += name
+                self._write_dict(buffer, value, end_marker)
+            elif isinstance(value, WideString):
+                buffer.append(TYPE_WIDESTRING)
+                buffer += name
+                buffer += value.encode('utf-16-le') + b'\x00\x00'
+            elif isinstance(value, str):
+                buffer.append(TYPE_STRING)
+                buffer += name
+                buffer += value.encode('utf-8') + b'\x00'
+            elif isinstance(value, float):
+                buffer.append(TYPE_FLOAT32)
+                buffer += name
+                buffer += FLOAT32.pack(value)
+            elif isinstance(value, (Pointer, Color)):
+                buffer.append(TYPE_POINTER if isinstance(value, Pointer) else TYPE_COLOR)
+                buffer += name
+                buffer += UINT32.pack(value)
+            elif isinstance(value, Int64):
+                buffer.append(TYPE_INT64)
+                buffer += name
+                buffer += INT64.pack(value)
+            elif isinstance(value, UInt64):
+                buffer.append(TYPE_UINT64)
+                buffer += name
+                buffer += UINT64.pack(value)
+            elif isinstance(value, int):
+                if 0 <= value <= 0xFFFFFFFF:
+                    buffer.append(TYPE_INT32)
+                    buffer += name
+                    buffer += UINT32.pack(value)
+                elif -0x80000000 <= value < 0:
+                    buffer.append(TYPE_INT32)
+                    buffer += name
+                    buffer += INT32.pack(value)
+                elif value > 0:
+                    buffer.append(TYPE_UINT64)
+                    buffer += name
+                    buffer += UINT64.pack(value)
+                else:
+                    buffer.append(TYPE_INT64)
+                    buffer += name
+                    buffer += INT64.pack(value)
+            else:
+                raise TypeError(f"Unsupported value type for key '{key}': {type(value)}")
+        buffer.append(end_marker)
+
+    def dump_bytes(self, data: dict) -> bytes:
+        '''
+        serializes data as binary vdf, maps end with the marker of the last
+        parsed file (0x08 or 0x0B), files mixing both are written with the root one
+        '''
+        buffer = bytearray()
+        self._write_dict(buffer, data, self.end_marker)
+        return bytes(buffer)
 
     def save_shortcut(self, path: str, data: dict):
-        '''Write back to the shortcuts.vdf file'''
-        with open(path, "wb") as f:
-            self.file = f
-            self._write_dict(data)
+        '''Write back to the shortcuts.vdf file, a temp file replaces it atomically'''
+        atomic_write(path, self.dump_bytes(data))
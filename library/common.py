@@ -3,6 +3,7 @@
 ''' Common functions needed for library provider '''
 import os
 import sys
+import threading
 from pathlib import Path
 from typing import Optional
 import platform
@@ -46,3 +47,19 @@ def find_path(paths) -> Optional[str]:
         if Path(path).exists():
             return path
     return None
+
+def is_path_available(path: str, timeout: float = 1.0) -> bool:
+    '''
+    returns whether path is an existing directory, a stat that does not finish
+    within timeout (ex: unresponsive network or removable drive) counts as missing
+    '''
+    result = []
+    def check():
+        result.append(os.path.isdir(path))
+    checker = threading.Thread(target=check, daemon=True)
+    checker.start()
+    checker.join(timeout)
+    if not result:
+        backend_log(f"{path} did not respond in {timeout}s")
+        return False
+    return result[0]
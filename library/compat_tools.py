@@ -0,0 +1,113 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Registry of Steam compatibility tools (Valve Proton and custom builds like GE-Proton) '''
+import os
+import re
+import threading
+from typing import Optional
+from utils.core import backend_log
+from library import text_vdf_parser
+
+TOOL_VALVE = "valve"
+TOOL_CUSTOM = "custom"
+
+_VERSION_RE = re.compile(r'\d+')
+
+def version_key(name: str) -> tuple:
+    ''' numeric parts of a tool name, so Proton 10.0 sorts above Proton 9.0 and 3.16 above 3.7 '''
+    return tuple(int(number) for number in _VERSION_RE.findall(name))
+
+def sort_key(tool: dict) -> tuple:
+    '''
+    Valve builds first, then custom tools, newest versions first and
+    unversioned builds (Experimental, Hotfix) after the versioned ones
+    '''
+    version = tool["version"]
+    return (tool["kind"] != TOOL_VALVE, not version, [-number for number in version],
+            tool["name"].lower())
+
+def read_display_name(tool_path: str) -> Optional[str]:
+    ''' display name from compatibilitytool.vdf of custom tools '''
+    try:
+        with open(os.path.join(tool_path, "compatibilitytool.vdf"), 'r', encoding='utf-8') as f:
+            data = text_vdf_parser.loads(f.read())
+    except (FileNotFoundError, PermissionError, ValueError):
+        return None
+    for tool in data.get("compatibilitytools", {}).get("compat_tools", {}).values():
+        if isinstance(tool, dict) and tool.get("display_name"):
+            return tool["display_name"]
+    return None
+
+def find_tools(root: str, kind: str) -> list:
+    ''' tools inside root, any folder with a proton script is a tool '''
+    tools = []
+    try:
+        entries = list(os.scandir(root))
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return tools
+    for entry in entries:
+        if not entry.is_dir() or not os.path.isfile(os.path.join(entry.path, "proton")):
+            continue
+        tool = {
+            "name" : entry.name,
+            "path" : entry.path,
+            "proton" : os.path.join(entry.path, "proton"),
+            "kind" : kind,
+            "version" : version_key(entry.name),
+        }
+        if kind == TOOL_CUSTOM:
+            tool["displayName"] = read_display_name(entry.path) or entry.name
+        tools.append(tool)
+    return tools
+
+class CompatToolRegistry:
+    ''' Indexes compat tools, the index is rebuilt only when one of the tool folders changes '''
+    def __init__(self):
+        self.tools = []
+        self.by_name = {}
+        self.signature = None
+        self.lock = threading.Lock()
+
+    def _roots(self, steam_path: str, steamapps_paths: list) -> list:
+        roots = [(os.path.join(steamapps, "common"), TOOL_VALVE) for steamapps in steamapps_paths]
+        roots.append((os.path.join(steam_path, "compatibilitytools.d"), TOOL_CUSTOM))
+        return roots
+
+    def _signature(self, roots: list) -> tuple:
+        signature = []
+        for root, _ in roots:
+            try:
+                signature.append((root, os.stat(root).st_mtime_ns))
+            except OSError:
+                signature.append((root, None))
+        return tuple(signature)
+
+    def refresh(self, steam_path: str, steamapps_paths: list) -> list:
+        ''' returns the sorted tool list, rescanning folders only if they changed '''
+        roots = self._roots(steam_path, steamapps_paths)
+        signature = self._signature(roots)
+        with self.lock:
+            if signature == self.signature:
+                return self.tools
+        tools = []
+        for root, kind in roots:
+            tools.extend(find_tools(root, kind))
+        tools.sort(key=sort_key)
+        by_name = {}
+        for tool in tools:
+            # a build installed in two libraries is listed once
+            by_name.setdefault(tool["name"], tool)
+        tools = [tool for tool in tools if by_name[tool["name"]] is tool]
+        backend_log(f"compat tools: {[tool['name'] for tool in tools]}")
+        with self.lock:
+            self.tools = tools
+            self.by_name = by_name
+            self.signature = signature
+        return tools
+
+    def get(self, name: str) -> Optional[dict]:
+        ''' tool by name, from the last refresh '''
+        with self.lock:
+            return self.by_name.get(name)
+
+compat_tools = CompatToolRegistry()
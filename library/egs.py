@@ -6,6 +6,7 @@ from pathlib import Path
 from functools import lru_cache
 from typing import Optional
 from library import wrapper, common
+from library.scan_cache import scan_cache
 from utils.core import backend_log
 
 system = platform.system()
@@ -63,10 +64,10 @@ def get_heroic_games() -> dict:
     if not Path(heroic["installed.json"]).exists():
         backend_log("heroic installed.json not found")
         return games
-    installed = open(heroic["installed.json"], encoding='utf-8')
     try:
-        manifest = json.load(installed)
-        for _, gameinfo in manifest.items():
+        # installed.json is only parsed again when it changes
+        manifest = scan_cache.parse(heroic["installed.json"], read_heroic_manifest)
+        for gameinfo in manifest:
             app_id = gameinfo["app_name"]
             app_name = gameinfo["title"]
             game_dir = os.path.join(gameinfo["install_path"], gameinfo["executable"])
@@ -83,9 +84,15 @@ def get_heroic_games() -> dict:
                 }
     except (PermissionError, IndexError, json.decoder.JSONDecodeError) as e:
         backend_log(f"Exception occured: {e}")
-    installed.close()
     return games
 
+def read_heroic_manifest(installed_json: str) -> list:
+    ''' read the fields Mukkuru needs from heroic installed.json '''
+    with open(installed_json, encoding='utf-8') as installed:
+        manifest = json.load(installed)
+    fields = ("app_name", "title", "install_path", "executable")
+    return [{field: gameinfo[field] for field in fields} for gameinfo in manifest.values()]
+
 def get_egs_env() -> Optional[dict]:
     ''' Windows/MacOS gets egs environment '''
     egs = {}
@@ -138,24 +145,32 @@ def get_egs_games() -> dict:
         if filename.endswith(".item"):
             filepath = os.path.join(manifest_dir, filename)
             try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    manifest = json.load(f)
-                    app_name = manifest["DisplayName"]
-                    app_id = manifest["AppName"]
-                    game_dir = os.path.join(manifest["InstallLocation"],
-                                            manifest["LaunchExecutable"])
-                    if app_name and app_id:
-                        games[app_id] = {
-                            "AppName" : app_name,
-                            "catalogNamespace" : manifest["MainGameCatalogNamespace"],
-                            "catalogItemID" : manifest["MainGameCatalogItemId"],
-                            "LaunchOptions" : "",
-                            "Exe" : game_dir,
-                            "StartDir" : manifest["InstallLocation"],
-                            "Source" : "egs",
-                            "Type" : egs["Type"]
-                        }
+                # .item manifests are only parsed again when they change
+                manifest = scan_cache.parse(filepath, read_egs_manifest)
+                app_name = manifest["DisplayName"]
+                app_id = manifest["AppName"]
+                game_dir = os.path.join(manifest["InstallLocation"],
+                                        manifest["LaunchExecutable"])
+                if app_name and app_id:
+                    games[app_id] = {
+                        "AppName" : app_name,
+                        "catalogNamespace" : manifest["MainGameCatalogNamespace"],
+                        "catalogItemID" : manifest["MainGameCatalogItemId"],
+                        "LaunchOptions" : "",
+                        "Exe" : game_dir,
+                        "StartDir" : manifest["InstallLocation"],
+                        "Source" : "egs",
+                        "Type" : egs["Type"]
+                    }
 
             except (PermissionError, IndexError, json.decoder.JSONDecodeError) as e:
                 backend_log(f"Exception occured: {e}")
     return games
+
+def read_egs_manifest(filepath: str) -> dict:
+    ''' read the fields Mukkuru needs from an EGS .item manifest '''
+    fields = ("DisplayName", "AppName", "InstallLocation", "LaunchExecutable",
+              "MainGameCatalogNamespace", "MainGameCatalogItemId")
+    with open(filepath, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return {field: manifest[field] for field in fields}
@@ -2,39 +2,69 @@
 # Licensed under the MIT License
 ''' Mukkuru games module '''
 import os
-import json
 import subprocess
-import queue
 import time
 import platform
 import threading
-from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
-from utils.core import mukkuru_env, backend_log, set_alive_status
+from typing import Callable, Optional
+from utils.core import backend_log, set_alive_status
 from utils.core import get_config, update_config, sanitized_env, normalize_text
+from utils.jobs import jobs
 from library.steam import get_steam_env, get_crossover_steam
 from library.steam import get_steam_games, get_non_steam_games, read_steam_username
+from library.steam import set_launch_options_batch, set_shortcut_launch_options_batch
+from library.steam import save_mukkuru_steam_id
 from library import grid_db, wrapper
+from library.scan_cache import scan_cache
+from library.playtime import playtime_index
+from library.library_store import library_store
+from library.artwork_index import artwork_index, asset_path
+from library.artwork_queue import ArtworkQueue
+from library.artwork_status import artwork_status
+from library.image_variants import image_pipeline
+from library.launch_manager import launch_manager
 from library.egs import read_heroic_username, get_heroic_env, get_egs_env
 from library.egs import get_heroic_games, get_egs_games
 
-artwork_queue = queue.Queue()
+artwork_queue = ArtworkQueue()
+scan_stats = {}
+artwork_refresh_lock = threading.Lock()
 
-def artwork_worker() -> None:
-    ''' Processes artwork queue '''
-    while True:
-        print("arwork_work init")
-        games = artwork_queue.get()
-        print("received queue")
-        if games is None:
-            break
-        try:
-            scan_artwork(games)
-        except (queue.Empty) as e:
-            print("Worker error:", e)
-        finally:
-            artwork_queue.task_done()
+def start_artwork_workers() -> None:
+    ''' starts artworkWorkers threads serving the artwork queue '''
+    workers = get_config()["artworkWorkers"]
+    artwork_queue.start(process_artwork, workers, refresh_artwork)
+
+def artwork_candidates(games: dict) -> set:
+    ''' returns app ids of games missing artwork that was not recently reported missing '''
+    candidates = set()
+    for flag, app_ids in artwork_index.missing(games).items():
+        candidates.update(app_id for app_id in app_ids
+                          if not artwork_status.is_missing(app_id, flag))
+    return candidates
+
+def queue_artwork(games: dict) -> int:
+    ''' queues games missing artwork, returns how many games were queued '''
+    return sum(artwork_queue.put(app_id, games[app_id]) for app_id in artwork_candidates(games))
+
+def process_artwork(app_id: str, game: dict) -> None:
+    ''' downloads the missing artwork of a queued game '''
+    config = get_config()
+    update_sgdb_api(config)
+    fetch_artwork(app_id, game, config["useAlternativeImage"],
+                  lambda: artwork_queue.is_dropped(app_id))
+
+def refresh_artwork(idle: bool) -> None:
+    ''' updates library artwork flags '''
+    with artwork_refresh_lock:
+        games = get_games()
+        if idle:
+            scan_thumbnails(games)
+            set_alive_status({"command": "ScanFinished"})
+        elif scan_thumbnails(games) is not games:
+            set_alive_status({"command": "reloadGameThumbnails"})
 
 def update_sgdb_api(user_config: dict) -> None:
     ''' updates sgdb api, if needed '''
@@ -45,6 +75,17 @@ def update_sgdb_api(user_config: dict) -> None:
         grid_db.API_URL = grid_db.SGDB_URL
         grid_db.API_KEY = user_config["sgdb_key"]
 
+def run_provider(name: str, provider, *args) -> tuple:
+    ''' runs a library provider, returns its games and wall time '''
+    start = time.perf_counter()
+    games = scan_cache.run(name, provider, *args)
+    return games, time.perf_counter() - start
+
+def previous_entries(provider: str) -> dict:
+    ''' returns copies of the library entries a provider reported in the last scan '''
+    return {app_id : dict(game) for app_id, game in get_games().items()
+            if game.get("Provider") == provider}
+
 def library_scan(options: int) -> dict:
     '''
     Scan library for games
@@ -57,75 +98,149 @@ def library_scan(options: int) -> dict:
     option_nonsteam = 1 << 1  # 0010 = 2
     option_egs = 1 << 2  # 0100 = 4
     option_heroic = 1 << 3 # 1000 = 8
+    scan_start = time.perf_counter()
     steam = get_steam_env()
     crossover_steam = get_crossover_steam()
     games = {}
+    # app id collisions keep the entry of the store ranked first in storePreference
+    providers = []
     if steam is not None:
         if options & option_steam:
-            steam_games = get_steam_games(steam)
-            games.update(steam_games)
+            providers.append(("steam", get_steam_games, steam))
         if (options & option_nonsteam) and steam["shortcuts"] is not None:
-            non_steam_games = get_non_steam_games(steam)
-            games.update(non_steam_games)
+            providers.append(("non-steam", get_non_steam_games, steam))
     if crossover_steam is not None:
         if options & option_steam:
-            crossover_steam_games = get_steam_games(crossover_steam)
-            games.update(crossover_steam_games)
+            providers.append(("crossover_steam", get_steam_games, crossover_steam))
         if (options & option_nonsteam) and crossover_steam["shortcuts"] is not None:
-            crossover_non_steam_games = get_non_steam_games(crossover_steam)
-            games.update(crossover_non_steam_games)
+            providers.append(("crossover_non-steam", get_non_steam_games, crossover_steam))
     if options & option_egs:
-        egs_games = get_egs_games()
-        games.update(egs_games)
+        providers.append(("egs", get_egs_games))
     if options & option_heroic:
-        heroic_games = get_heroic_games()
-        games.update(heroic_games)
-    library_filtering(games)
+        providers.append(("heroic", get_heroic_games))
+    scan_cache.begin()
+    provider_stats = {}
+    completed = []
+    rank = store_rank(get_config())
+    merged = []
+    if providers:
+        max_workers = max(1, min(len(providers), get_config()["cores"]))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(run_provider, *provider) for provider in providers]
+            for provider, future in zip(providers, futures):
+                name = provider[0]
+                try:
+                    provider_games, elapsed = future.result()
+                except (OSError, KeyError, ValueError, IndexError) as e:
+                    # a transient failure must not drop the store from library.json
+                    provider_games = previous_entries(name)
+                    backend_log(f"{name} scan failed, keeping {len(provider_games)} "
+                                f"previous entries: {e}")
+                    provider_stats[name] = {"error" : str(e), "kept" : len(provider_games)}
+                else:
+                    completed.append(name)
+                    provider_stats[name] = {
+                        "time" : round(elapsed, 3),
+                        "games" : len(provider_games)
+                    }
+                    backend_log(f"{name}: {len(provider_games)} games in {elapsed:.3f}s")
+                for app_id, game in provider_games.items():
+                    game["Provider"] = name
+                    current = games.get(app_id)
+                    if current is not None:
+                        # same app id in two stores, e.g. native and CrossOver Steam
+                        if rank(current) <= rank(game):
+                            merged.append(merge_record(current, app_id, game, app_id))
+                            continue
+                        merged.append(merge_record(game, app_id, current, app_id))
+                    games[app_id] = game
+    scan_stats["providers"] = provider_stats
+    save_mukkuru_steam_id()
+    scan_stats["cache"] = scan_cache.end(completed)
+    cache_stats = scan_stats["cache"]
+    backend_log(f'scan cache: {cache_stats["reused"]} reused, {cache_stats["parsed"]} parsed, '
+                f'{cache_stats["removed"]} removed')
+    merged.extend(library_filtering(games))
+    scan_stats["merged"] = merged
+    playtime_index.refresh_async()
+    scan_stats["time"] = round(time.perf_counter() - scan_start, 3)
     return games
 
-def library_filtering(games: dict) -> None:
-    ''' handles post scan game filtering '''
+def store_rank(user_config: dict):
+    ''' returns a key function, lower values are preferred by storePreference '''
+    preference = {name : index for index, name in enumerate(user_config["storePreference"])}
+    def rank(game: dict) -> int:
+        return preference.get(game.get("Provider"), len(preference))
+    return rank
+
+def merge_record(kept: dict, kept_id: str, dropped: dict, dropped_id: str) -> dict:
+    ''' describes a duplicate that was dropped in favour of another entry '''
+    return {
+        "title" : kept["AppName"],
+        "kept" : kept_id,
+        "keptProvider" : kept.get("Provider"),
+        "dropped" : dropped_id,
+        "droppedProvider" : dropped.get("Provider")
+    }
+
+def library_filtering(games: dict) -> list:
+    '''
+    handles post scan game filtering, duplicated titles keep the entry of the
+    store preferred by storePreference (first seen on ties), returns merges
+    '''
     user_config = get_config()
+    merged = []
     if user_config["skipDuplicated"]:
-        game_titles = []
-        for key, value in games.copy().items():
-            game_title = normalize_text(value["AppName"])
-            if game_title in game_titles:
-                backend_log(f"skipping duplicated: {game_title} due to user settings")
-                del games[key]
-            else:
-                game_titles.append(game_title)
+        rank = store_rank(user_config)
+        # normalized title -> app id of the entry kept so far
+        titles = {}
+        dropped = []
+        for key, value in games.items():
+            game_title = normalize_text(value["AppName"], remove_symbols=True)
+            kept_key = titles.get(game_title)
+            if kept_key is None:
+                titles[game_title] = key
+                continue
+            kept = games[kept_key]
+            if rank(value) < rank(kept):
+                titles[game_title] = key
+                kept_key, key = key, kept_key
+            backend_log(f"skipping duplicated: {game_title} due to user settings")
+            merged.append(merge_record(games[kept_key], kept_key, games[key], key))
+            dropped.append(key)
+        for key in dropped:
+            del games[key]
+    return merged
 
 def get_games() -> dict:
-    '''get game library as json'''
-    try:
-        with open(mukkuru_env["library.json"], encoding='utf-8') as f:
-            games = json.load(f)
-    except FileNotFoundError:
-        games = {}
-        update_games(games)
-    return games
+    '''get game library snapshot, must not be modified in place'''
+    return library_store.get()
 
 def update_games(games: dict) -> None:
-    '''save game library'''
-    with open(mukkuru_env["library.json"], 'w', encoding='utf-8') as f:
-        json.dump(games, f)
+    '''save game library, writes are batched and done atomically'''
+    library_store.update(games)
 
 def scan_games() -> dict:
     ''' scan for games, download artwork if available '''
     user_config = get_config()
     options = user_config["librarySource"]
-    games = library_scan(int(options))
-    artwork_queue.put(games)
-    scan_thumbnails(games)
+    games, _ = artwork_index.apply(library_scan(int(options)))
+    # a cancelled scan keeps the previous library
+    jobs.check_cancelled()
+    update_games(games)
+    queued = queue_artwork(games)
+    if queued > 0:
+        backend_log(f"queued artwork of {queued} games")
     time.sleep(0.1)
     return games
 
-def fetch_artwork(app_id: str, game, b1, b2, b3, use_alt_images) -> dict:
-    ''' handle artwork '''
-    blacklist_1 = []
-    blacklist_2 = []
-    blacklist_3 = []
+def fetch_artwork(app_id: str, game, use_alt_images,
+                  cancelled: Optional[Callable[[], bool]] = None) -> list:
+    '''
+    handle artwork, returns the asset flags SteamGridDB does not have.
+    Stops before the next download once cancelled() returns True.
+    '''
+    missing = []
     hero_index = 0
     boxart_index = 0
     logo_index = 0
@@ -141,75 +256,90 @@ def fetch_artwork(app_id: str, game, b1, b2, b3, use_alt_images) -> dict:
         if alt_option & option_logo:
             logo_index = 1
         print(f"using alternate image for {game['AppName']}")
-    thumbnail = os.path.join(mukkuru_env["root"], "thumbnails", f'{app_id}.jpg')
     game_source = game["Source"]
     game_identifier = grid_db.GameIdentifier(game["AppName"], app_id, game_source)
-    if not Path(thumbnail).is_file() and app_id not in b1:
-        if grid_db.download_image(game_identifier, thumbnail,"1:1", boxart_index) == "Missing":
-            blacklist_1.append(app_id)
-    hero = os.path.join(mukkuru_env["root"], "hero", f'{app_id}.png')
-    if not Path(hero).is_file() and app_id not in b2:
-        if grid_db.download_image(game_identifier, hero, "hero", hero_index) == "Missing":
-            blacklist_2.append(app_id)
-    logo = os.path.join(mukkuru_env["root"], "logo", f'{app_id}.png')
-    if not Path(logo).is_file() and app_id not in b3:
-        if grid_db.download_image(game_identifier, logo,"logo", logo_index) == "Missing":
-            blacklist_3.append(app_id)
-    result = {}
-    result["1"] = blacklist_1
-    result["2"] = blacklist_2
-    result["3"] = blacklist_3
-    return result
+    assets = (("Thumbnail", "1:1", boxart_index), ("HeroArt", "hero", hero_index),
+              ("LogoArt", "logo", logo_index))
+    for flag, image_format, image_index in assets:
+        if artwork_index.has(app_id, flag) or artwork_status.is_missing(app_id, flag):
+            continue
+        if cancelled is not None and cancelled():
+            break
+        result = grid_db.download_image(game_identifier, asset_path(app_id, flag),
+                                        image_format, image_index)
+        if result is None:
+            # SteamGridDB could not be reached, looked up again on the next pass
+            continue
+        # False means SteamGridDB does not know the game at all
+        if result in ("Missing", False):
+            artwork_status.mark_missing(app_id, flag)
+            missing.append(flag)
+        else:
+            image_pipeline.process(app_id, flag, result)
+        artwork_index.check(app_id, flag)
+    return missing
 
 def scan_artwork(games = None) -> None:
-    ''' scan for games artwork '''
+    '''
+    queues the missing artwork of every game and waits for the artwork queue
+    to serve it, games already queued by a library scan are not queued twice
+    '''
     backend_log("scanning for new artwork..")
-    config = get_config()
-    update_sgdb_api(config)
-    blacklist1 = config["boxartBlacklist"]
-    blacklist2 = config["heroBlacklist"]
-    blacklist3 = config["logoBlacklist"]
-    use_alt_images = config["useAlternativeImage"]
     if games is None:
         games = get_games()
-    results = {}
-    with ThreadPoolExecutor(max_workers=config["cores"]*2) as executor:
-        future_to_key = {
-            executor.submit(fetch_artwork, k, v, blacklist1, blacklist2,
-                            blacklist3, use_alt_images): k
-            for k, v in games.items()
-        }
-        counter = 0
-        for future in as_completed(future_to_key):
-            k = future_to_key[future]
-            try:
-                results[k] = future.result()
-                blacklist1.extend(results[k]["1"])
-                blacklist2.extend(results[k]["2"])
-                blacklist3.extend(results[k]["3"])
-                counter = counter + 1
-                if counter % 12 == 0:
-                    set_alive_status({"command": "reloadGameThumbnails"})
-                    scan_thumbnails(games)
-            except (KeyError, OSError, IndexError, FileNotFoundError) as e:
-                results[k] = {"error": str(e)}
-                print(f"scan_artwork error: {str(e)}")
-    config["boxartBlacklist"] = blacklist1
-    config["heroBlacklist"] = blacklist2
-    config["logoBlacklist"] = blacklist3
-    update_config(config)
-    scan_thumbnails(games)
+    app_ids = artwork_candidates(games)
+    queued = {app_id for app_id in app_ids if artwork_queue.put(app_id, games[app_id])}
+    job = jobs.current()
+    remaining = app_ids
+    while remaining:
+        if job is not None:
+            if job.cancel_event.is_set():
+                # artwork downloaded so far is kept, games queued by others keep their turn
+                artwork_queue.drop(queued)
+                break
+            job.set_progress(len(app_ids) - len(remaining), len(app_ids), report=False)
+        remaining = artwork_queue.wait(remaining, timeout=0.5)
+    scan_thumbnails(get_games())
     set_alive_status({"command": "ScanFinished"})
+    jobs.check_cancelled()
+
+def scan_thumbnails(games: dict) -> dict:
+    '''
+    update the artwork flags for all games from the artwork index, the library
+    is only saved if a flag changed, returns games or its updated copy
+    '''
+    # entries are copied, games may be a snapshot shared with other threads
+    updated, changed = artwork_index.apply(games)
+    if not changed:
+        return games
+    update_games(updated)
+    return updated
 
-def scan_thumbnails(games: dict) -> None:
-    '''update the thumbnail status for all games'''
-    for k in games.keys():
-        thumbnail_path = os.path.join(mukkuru_env["root"], "thumbnails", f'{k}.jpg')
-        if not Path(thumbnail_path).is_file():
-            games[k]["Thumbnail"] = False
+def apply_launch_options(launch_options: dict) -> dict:
+    '''
+    sets {app_id: launch options} for steam games and non-steam shortcuts,
+    localconfig.vdf and shortcuts.vdf are parsed and written once
+    '''
+    games = get_games()
+    steam_options = {}
+    shortcut_options = {}
+    results = {}
+    for app_id, options in launch_options.items():
+        source = games.get(app_id, {}).get("Source")
+        if source == "steam":
+            steam_options[app_id] = options
+        elif source == "non-steam":
+            shortcut_options[app_id] = options
         else:
-            games[k]["Thumbnail"] = True
-    update_games(games)
+            backend_log(f"Unsupported source for {app_id}, "
+                        "only steam games and shortcuts supported")
+            results[app_id] = False
+    steam_env = get_steam_env()
+    if steam_options:
+        results.update(set_launch_options_batch(steam_env, steam_options))
+    if shortcut_options:
+        results.update(set_shortcut_launch_options_batch(steam_env, shortcut_options))
+    return results
 
 def get_game_properties(app_id: str) -> dict:
     ''' get game specific properties '''
@@ -241,10 +371,14 @@ def launch_lossless_scaling():
 
 # To-do:
 # set env at provider (steam/heroic/egs) level
-def launch_app(app_id: str) -> None:
-    '''launches an app using its appID'''
+def launch_app(app_id: str) -> bool:
+    '''launches an app using its appID, returns False if it can not be launched'''
     process_env = sanitized_env()
     games = get_games()
+    if not games[app_id].get("Launchable", True):
+        backend_log(f'{games[app_id]["AppName"]} belongs to steam user '
+                    f'{games[app_id]["SteamUser"]}, which is not logged in')
+        return False
     game_path = games[app_id]["Exe"].strip('"')
     working_dir = None
     backend_log(f'Launching game: {game_path} using {games[app_id]["LaunchOptions"]}')
@@ -266,17 +400,16 @@ def launch_app(app_id: str) -> None:
     if app_id in lossless_scaling and platform.system() == "Windows":
         threading.Thread(target=launch_lossless_scaling).start()
     backend_log(f"using {launch_command}")
-    subprocess.run(launch_command,
-                   stderr=subprocess.DEVNULL,
-                   stdout=subprocess.DEVNULL,
-                   cwd=working_dir,
-                   env=process_env, shell=True, check=False)
+    # the launcher runs in the background, so request threads are not held by games
+    launch_manager.launch(app_id, games[app_id], launch_command,
+                          cwd=working_dir, env=process_env)
     recent_played = user_config["recentPlayed"]
     if app_id not in recent_played:
         recent_played.insert(0, app_id)
         while len(recent_played) > 3:
             recent_played.pop(3)
         update_config(user_config)
+    return True
 
 def list_stores() -> list:
     ''' list valid storefronts for this device '''
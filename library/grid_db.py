@@ -4,10 +4,12 @@
 import os
 import re
 import unicodedata
+from typing import Optional
 import requests
-from PIL import Image
 from utils.core import backend_log
 from utils.bootstrap import download_file
+from utils.http_session import get_session
+from library.sgdb_id_cache import sgdb_id_cache, cache_key
 
 API_KEY = ""
 SGDB_URL = "https://www.steamgriddb.com/api/v2/"
@@ -23,47 +25,62 @@ class GameIdentifier(object):
         self.app_id = app_id
         self.platform = platform
 
-def search_game(term: str):
-    ''' search for game using a title term '''
-    url = f'{API_URL}search/autocomplete/{term}'
+def request_json(url: str) -> Optional[dict]:
+    '''
+    returns the decoded answer of SteamGridDB, 404 included since it tells a
+    game is unknown. None when there is no answer: transport errors, other
+    statuses (ex: 429 and 5xx once retries ran out) or an invalid body.
+    '''
+    try:
+        r=get_session().get(url, headers={"Authorization":f'Bearer {API_KEY}'}, timeout=20)
+    except requests.exceptions.RequestException as e:
+        backend_log(f"SteamGridDB request failed: {e}")
+        return None
+    if r.status_code not in (200, 404):
+        backend_log(f"SteamGridDB request failed: HTTP {r.status_code}")
+        return None
     try:
-        r=requests.get(url, headers={"Authorization":f'Bearer {API_KEY}'}, timeout=20)
         data = r.json()
-        if data["success"]:
-            games = data["data"]
-            return games
-        else:
-            return 0
-    except (requests.exceptions.JSONDecodeError, IndexError, KeyError):
-        return 0
-def get_game_id(term: str):
-    ''' find game id using a title name '''
-    game = search_game(term)
-    if game == 0:
-        return 0
+    except requests.exceptions.JSONDecodeError:
+        backend_log("Failed to decode JSON")
+        return None
+    if not isinstance(data, dict) or "success" not in data:
+        return None
+    return data
+
+def search_game(term: str):
+    ''' search for game using a title term, returns None when the lookup failed '''
+    data = request_json(f'{API_URL}search/autocomplete/{term}')
+    if data is None:
+        return None
+    if data["success"]:
+        return data.get("data") or []
+    return []
+
+def get_game_id(term: str) -> Optional[int]:
+    ''' find game id using a title name, 0 if there is no match and None if the lookup failed '''
+    games = search_game(term)
+    if games is None:
+        return None
     try:
-        return game[0]["id"]
-    except (IndexError, KeyError):
+        return games[0]["id"]
+    except (IndexError, KeyError, TypeError):
         return 0
 
-def get_id_from_platform(platform_id: str, platform_name: str):
-    ''' find game id using a title name '''
-    url = f'{API_URL}games/{platform_name}/{platform_id}'
-    r=requests.get(url, headers={"Authorization":f'Bearer {API_KEY}'}, timeout=20)
+def get_id_from_platform(platform_id: str, platform_name: str) -> Optional[int]:
+    ''' find game id using a platform id, 0 if it is unknown and None if the lookup failed '''
+    data = request_json(f'{API_URL}games/{platform_name}/{platform_id}')
+    if data is None:
+        return None
     try:
-        data = r.json()
         if data["success"]:
             return data["data"]["id"]
-        else:
-            return 0
-    except KeyError:
-        return 0
-    except requests.exceptions.JSONDecodeError:
-        backend_log("Failed to decode JSON")
         return 0
+    except (KeyError, TypeError):
+        return None
 
 def find_image_url(game_id: str, image_format:str, image_index: int = 0):
-    ''' find square picture '''
+    ''' find square picture, returns 0 if there is none and None if the lookup failed '''
     if image_format == "1:1":
         dimensions = "512x512,1024x1024"
         url = f'{API_URL}grids/game/{game_id}?dimensions={dimensions}'
@@ -75,8 +92,9 @@ def find_image_url(game_id: str, image_format:str, image_index: int = 0):
         url = f'{API_URL}logos/game/{game_id}?mimes={mimes}'
     else:
         return 0
-    r=requests.get(url, headers={"Authorization":f'Bearer {API_KEY}'}, timeout=20)
-    data = r.json()
+    data = request_json(url)
+    if data is None:
+        return None
     if data["success"]:
         try:
             images = data["data"]
@@ -100,19 +118,33 @@ def download_square_image(game_identifier: GameIdentifier, s_path: str):
     ''' download a 1:1 image '''
     return download_image(game_identifier, s_path, "1:1")
 
+def resolve_game_id(game_identifier: GameIdentifier):
+    ''' find SteamGridDb game id, ids are cached so each game is looked up once '''
+    key = cache_key(game_identifier.platform, game_identifier.app_id, game_identifier.title)
+    if key.startswith("steam/"):
+        return sgdb_id_cache.resolve(key, lambda: get_id_from_platform(game_identifier.app_id,
+                                                                       game_identifier.platform))
+    return sgdb_id_cache.resolve(key, lambda: get_game_id(game_identifier.title))
+
 def download_image(game_identifier: GameIdentifier, s_path: str,
                    image_format: str, image_index:int = 0):
-    ''' find and download image from SteamGridDb '''  
-    game_id = 0
+    '''
+    find and download image from SteamGridDb, returns the downloaded file,
+    False if SteamGridDB does not know the game, "Missing" if it has no such
+    image and None if it could not be reached, which is retried later
+    '''
     game_title = game_identifier.title
-    if game_identifier.app_id != 0 and game_identifier.platform == "steam":
-        game_id = get_id_from_platform(game_identifier.app_id, game_identifier.platform)
-    else:
-        game_id = get_game_id(game_title)
+    game_id = resolve_game_id(game_identifier)
+    if game_id is None:
+        backend_log(f"Unable to look up game {game_title}")
+        return None
     if game_id == 0:
         backend_log(f"Failed to find game {game_title}")
         return False
     file_url = find_image_url(game_id, image_format, image_index)
+    if file_url is None:
+        backend_log(f"Unable to look up game asset : {game_title} [{image_format}]")
+        return None
     if file_url == 0:
         backend_log(f"Failed to find game asset : {game_title} [{image_format}]")
         return "Missing"
@@ -129,11 +161,5 @@ def download_image(game_identifier: GameIdentifier, s_path: str,
     else:
         output_file = os.path.join(s_path, f'{sanitize_filename_ascii(game_title)}.{extension}')
     download_file(file_url, output_file)
-    if extension != "jpg" and image_format == "1:1":
-        new_file = output_file.replace(f".{extension}", ".jpg")
-        backend_log(f'{output_file} > {new_file}')
-        im = Image.open(output_file)
-        im.convert('RGB').save(new_file,"JPEG")
-        os.remove(output_file)
-        return new_file
+    # files keep the downloaded format, image_variants converts them
     return output_file
@@ -0,0 +1,55 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+'''
+Artwork rendering run by image_variants worker processes. Spawned workers
+start from this module, keep its imports limited to PIL.
+'''
+import os
+import tempfile
+from pathlib import Path
+from PIL import Image
+
+SAVE_FORMATS = {".jpg" : "JPEG", ".png" : "PNG"}
+
+def save_image(image: Image.Image, path: str, image_format: str, **options) -> None:
+    ''' saves into a temp file next to path first, clients never read a partial image '''
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.",
+                                    suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, image_format, **options)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+def render_asset(source: str, target: str, variants: list) -> None:
+    '''
+    decodes source once, saves it as target when they differ (ex: a png grid
+    becomes the jpg thumbnail) and writes every (size, [(path, format, options)])
+    variant.
+    '''
+    with Image.open(source) as image:
+        if source != target:
+            target_format = SAVE_FORMATS[os.path.splitext(target)[1]]
+            if target_format == "JPEG":
+                image = image.convert("RGB")
+            save_image(image, target, target_format)
+        elif variants:
+            # jpeg can be decoded at a reduced scale, enough for the largest variant
+            largest = max(size for size, _ in variants)
+            image.draft("RGB", largest)
+        rgb = image.convert("RGB")
+        for size, outputs in variants:
+            resized = rgb.copy()
+            resized.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            for path, image_format, options in outputs:
+                save_image(resized, path, image_format, **options)
+    if source != target:
+        os.remove(source)
+
+def ready() -> bool:
+    ''' no-op task, used to start the worker processes '''
+    return True
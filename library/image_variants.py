@@ -0,0 +1,179 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Normalizes downloaded artwork and renders resized variants in a process pool '''
+import os
+import sys
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from PIL import UnidentifiedImageError
+from utils.core import mukkuru_env, backend_log
+from library.artwork_index import ASSETS, asset_path, scan_folder
+from library import image_render
+from library.image_render import render_asset
+
+# asset flag -> {variant: largest size}, variants are never upscaled
+VARIANTS = {
+    "Thumbnail" : {"tile" : (384, 384)},
+    "HeroArt" : {"screen" : (1920, 1080)},
+}
+# each variant is saved in both formats, webp goes to clients that accept it
+VARIANT_FORMATS = {
+    "webp" : ("WEBP", {"quality" : 80, "method" : 2}),
+    "jpg" : ("JPEG", {"quality" : 85, "optimize" : True}),
+}
+MIMETYPES = {".jpg" : "image/jpeg", ".png" : "image/png", ".webp" : "image/webp"}
+POOL_WORKERS = 2
+
+def variant_path(app_id: str, flag: str, variant: str, extension: str) -> str:
+    ''' path where a variant of a game asset is stored '''
+    folder, _ = ASSETS[flag]
+    return os.path.join(mukkuru_env["root"], folder, variant, f"{app_id}.{extension}")
+
+class ImagePipeline:
+    '''
+    Sends artwork to a pool of processes, decoding there does not stall the
+    server threads. Without a pool, ex: start() was not called or the pool
+    stopped, artwork is rendered in the calling thread.
+    '''
+    def __init__(self, workers: int = POOL_WORKERS):
+        self.workers = workers
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def start(self) -> None:
+        '''
+        starts the worker processes once, from the main thread before any other
+        thread starts. Spawned processes run the main module of the parent, the
+        whole app, so image_render stands in for it while workers are spawned.
+        '''
+        # forking a process with running server threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = image_render
+        try:
+            executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            # a worker is spawned by each submit while none is idle, all of them start here
+            for _ in range(self.workers):
+                executor.submit(image_render.ready)
+        except (OSError, RuntimeError) as e:
+            backend_log(f"image pool unavailable, rendering in process: {e}")
+            return
+        finally:
+            sys.modules["__main__"] = main
+        with self.lock:
+            self.executor = executor
+
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        with self.lock:
+            return self.executor
+
+    def _stopped(self, error: Exception) -> None:
+        ''' workers are not spawned again outside start(), artwork renders in process '''
+        backend_log(f"image pool stopped, rendering in process: {error}")
+        with self.lock:
+            self.executor = None
+
+    def _render(self, source: str, target: str, variants: list) -> None:
+        ''' renders in the pool, or in this thread when there is no pool '''
+        executor = self._executor()
+        if executor is not None:
+            try:
+                executor.submit(render_asset, source, target, variants).result()
+                return
+            except BrokenProcessPool as e:
+                self._stopped(e)
+        if not os.path.exists(source):
+            # the worker converted source before it stopped
+            source = target
+        render_asset(source, target, variants)
+
+    def _job(self, app_id: str, flag: str, source: Optional[str] = None) -> Optional[tuple]:
+        ''' returns render_asset arguments, None when there is nothing to do '''
+        target = asset_path(app_id, flag)
+        if source is None:
+            source = target
+        variants = []
+        for variant, size in VARIANTS.get(flag, {}).items():
+            outputs = [(variant_path(app_id, flag, variant, extension), image_format, options)
+                       for extension, (image_format, options) in VARIANT_FORMATS.items()]
+            variants.append((size, outputs))
+        if source == target and not variants:
+            return None
+        return (source, target, variants)
+
+    def process(self, app_id: str, flag: str, source: str) -> bool:
+        ''' normalizes a downloaded asset and renders its variants, returns False on failure '''
+        job = self._job(app_id, flag, source)
+        if job is None:
+            return True
+        try:
+            self._render(*job)
+        except (OSError, ValueError, KeyError, UnidentifiedImageError) as e:
+            backend_log(f"unable to process {source}: {e}")
+            return False
+        return True
+
+    def backfill(self, app_ids: dict) -> int:
+        '''
+        renders variants missing for {flag: [app ids with the asset]},
+        ex: artwork downloaded before variants existed. Returns how many were rendered.
+        '''
+        pending = []
+        for flag, ids in app_ids.items():
+            for variant in VARIANTS.get(flag, {}):
+                folder = os.path.dirname(variant_path("", flag, variant, "webp"))
+                rendered = scan_folder(folder, ".webp") & scan_folder(folder, ".jpg")
+                pending.extend((app_id, flag) for app_id in ids if app_id not in rendered)
+        if not pending:
+            return 0
+        backend_log(f"rendering artwork variants of {len(pending)} assets")
+        tasks = [(app_id, self._job(app_id, flag)) for app_id, flag in dict.fromkeys(pending)]
+        executor = self._executor()
+        if executor is None:
+            rendered = 0
+            for app_id, job in tasks:
+                try:
+                    render_asset(*job)
+                    rendered += 1
+                except (OSError, ValueError, KeyError, UnidentifiedImageError) as e:
+                    backend_log(f"unable to render variants of {app_id}: {e}")
+            return rendered
+        futures = {executor.submit(render_asset, *job): app_id for app_id, job in tasks}
+        rendered = 0
+        for future in as_completed(futures):
+            try:
+                future.result()
+                rendered += 1
+            except BrokenProcessPool as e:
+                self._stopped(e)
+                break
+            except (OSError, ValueError, KeyError, UnidentifiedImageError) as e:
+                backend_log(f"unable to render variants of {futures[future]}: {e}")
+        return rendered
+
+    def resolve(self, path: str, accepts_webp: bool) -> tuple:
+        '''
+        maps a requested artwork path to (existing path, mimetype), variant
+        requests fall back to the jpg variant and then to the original asset
+        '''
+        parts = path.split("/")
+        if len(parts) == 3:
+            folder, variant, filename = parts
+            app_id = os.path.splitext(filename)[0]
+            for flag, (asset_folder, extension) in ASSETS.items():
+                if asset_folder != folder or variant not in VARIANTS.get(flag, {}):
+                    continue
+                candidates = [f"{folder}/{variant}/{app_id}.jpg", f"{folder}/{app_id}{extension}"]
+                if accepts_webp:
+                    candidates.insert(0, f"{folder}/{variant}/{app_id}.webp")
+                for candidate in candidates:
+                    if os.path.isfile(os.path.join(mukkuru_env["root"], candidate)):
+                        path = candidate
+                        break
+                break
+        return path, MIMETYPES.get(os.path.splitext(path)[1], "image/jpeg")
+
+image_pipeline = ImagePipeline()
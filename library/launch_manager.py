@@ -0,0 +1,257 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Launches games without blocking and tracks them while they run '''
+import os
+import time
+import platform
+import threading
+import subprocess
+from typing import Optional
+import psutil
+from utils.core import backend_log
+from utils.json_store import JsonStore
+
+# seconds between process checks, a single thread checks every running game
+POLL_INTERVAL = 2.0
+# store launchers (ex: steam://) exit right away and the game starts later,
+# sessions without processes are kept this long before they are ended
+STARTUP_GRACE = 30.0
+# sessions kept per app in sessions.json
+MAX_SESSIONS = 20
+# launch commands may start a store client, which is never part of a game session
+STORE_CLIENTS = {"steam", "steam.exe", "steam.sh", "steam_osx", "steamwebhelper",
+                 "steamwebhelper.exe", "epicgameslauncher", "epicgameslauncher.exe",
+                 "heroic", "heroic.exe"}
+
+def is_inside(path: Optional[str], directory: str) -> bool:
+    ''' returns whether path is inside directory '''
+    if not path:
+        return False
+    if path[:3].upper() == "Z:\\":
+        # wine maps the unix root to Z:, ex: Proton games
+        path = path[2:].replace("\\", "/")
+    path = os.path.normcase(os.path.abspath(path))
+    return path.startswith(directory + os.sep)
+
+def is_store_client(process: psutil.Process) -> bool:
+    ''' returns whether process is a store client rather than a game '''
+    try:
+        return process.name().lower() in STORE_CLIENTS
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+
+def steam_launch_id(app_id: str, game: dict) -> Optional[str]:
+    ''' AppId steam passes to the reaper process of a game, None for other stores '''
+    source = game.get("Source")
+    if source == "steam":
+        return app_id
+    if source == "non-steam" and app_id.isdigit():
+        # shortcuts are listed by rungameid, steam uses their 32 bit id
+        return str(int(app_id) >> 32)
+    return None
+
+def is_steam_reaper(cmdline: list, launch_id: str) -> bool:
+    ''' matches "reaper SteamLaunch AppId=<id> -- game", which steam wraps games in '''
+    return "SteamLaunch" in cmdline[:3] and f"AppId={launch_id}" in cmdline
+
+class SessionHistory(JsonStore):
+    ''' Keeps {app id: [{"start", "end", "duration"}]} in sessions.json, newest last '''
+    env_key = "sessions.json"
+    name = "sessions"
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__(path)
+        self.sessions = None
+
+    def _load(self) -> None:
+        data = self._read()
+        self.sessions = data if isinstance(data, dict) else {}
+
+    def get(self, app_id: str) -> list:
+        ''' returns recorded sessions of an app '''
+        with self.lock:
+            if self.sessions is None:
+                self._load()
+            return list(self.sessions.get(app_id, []))
+
+    def record(self, app_id: str, record: dict) -> None:
+        ''' appends a session, only the last MAX_SESSIONS of an app are kept '''
+        with self.lock:
+            if self.sessions is None:
+                self._load()
+            app_sessions = self.sessions.setdefault(app_id, [])
+            app_sessions.append(record)
+            del app_sessions[:-MAX_SESSIONS]
+            self._changed()
+
+    def _dump(self) -> dict:
+        return {app_id : sessions.copy() for app_id, sessions in self.sessions.items()}
+
+class LaunchManager:
+    '''
+    Spawns games and follows the launcher, its descendants, the steam reaper of
+    the game and processes started from the game folder. Store clients the
+    launcher starts (ex: steam://rungameid starting Steam) and their other
+    children are never tracked, stopping a game must not close the store.
+    '''
+    def __init__(self):
+        self.sessions = {}
+        self.history = SessionHistory()
+        self.monitor = None
+        self.lock = threading.Lock()
+
+    def launch(self, app_id: str, game: dict, command: str,
+               cwd: Optional[str] = None, env: Optional[dict] = None) -> None:
+        ''' starts command in the background and tracks it as a session of app_id '''
+        options = {}
+        if platform.system() == "Windows":
+            options["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP#pylint: disable=E1101
+        else:
+            options["start_new_session"] = True
+        process = subprocess.Popen(command,#pylint: disable=R1732
+                                   stdin=subprocess.DEVNULL,
+                                   stderr=subprocess.DEVNULL,
+                                   stdout=subprocess.DEVNULL,
+                                   cwd=cwd, env=env, shell=True, **options)
+        install_dir = game.get("InstallDir")
+        if install_dir:
+            install_dir = os.path.normcase(os.path.abspath(install_dir))
+        session = {
+            "appId" : app_id,
+            "AppName" : game.get("AppName", app_id),
+            "start" : time.time(),
+            "process" : process,
+            "pids" : {process.pid},
+            "installDir" : install_dir,
+            "steamLaunchId" : steam_launch_id(app_id, game),
+            "lastSeen" : time.monotonic(),
+        }
+        with self.lock:
+            previous = self.sessions.get(app_id)
+        if previous is not None:
+            # a relaunch replaces the session, the previous one is recorded first
+            backend_log(f'{session["AppName"]} launched again, closing its previous session')
+            self._end(previous)
+        with self.lock:
+            self.sessions[app_id] = session
+            if self.monitor is None:
+                self.monitor = threading.Thread(target=self._monitor, daemon=True)
+                self.monitor.start()
+
+    def _track(self, session: dict, game_processes: list) -> bool:
+        ''' refreshes the processes of a session, returns whether any is alive '''
+        session["process"].poll()
+        pending = list(session["pids"])
+        for pid, exe, cmdline in game_processes:
+            if session["steamLaunchId"] and is_steam_reaper(cmdline, session["steamLaunchId"]):
+                pending.append(pid)
+            elif session["installDir"] and (is_inside(exe, session["installDir"]) or
+                                            is_inside(cmdline[0] if cmdline else None,
+                                                      session["installDir"])):
+                pending.append(pid)
+        pids = set()
+        # walks descendants, skipping store clients and everything they started
+        while pending:
+            pid = pending.pop()
+            if pid in pids:
+                continue
+            try:
+                process = psutil.Process(pid)
+                if process.status() == psutil.STATUS_ZOMBIE or is_store_client(process):
+                    continue
+                pids.add(pid)
+                pending.extend(child.pid for child in process.children())
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        session["pids"] = pids
+        return bool(pids)
+
+    def _monitor(self) -> None:
+        while True:
+            time.sleep(POLL_INTERVAL)
+            with self.lock:
+                sessions = list(self.sessions.values())
+                if not sessions:
+                    self.monitor = None
+                    return
+            game_processes = []
+            if any(session["installDir"] or session["steamLaunchId"] for session in sessions):
+                for process in psutil.process_iter(['pid', 'exe', 'cmdline']):
+                    game_processes.append((process.info['pid'], process.info['exe'],
+                                           process.info['cmdline'] or []))
+            now = time.monotonic()
+            ended = []
+            for session in sessions:
+                if self._track(session, game_processes):
+                    session["lastSeen"] = now
+                elif now - session["lastSeen"] > STARTUP_GRACE:
+                    ended.append(session)
+            for session in ended:
+                self._end(session)
+
+    def _end(self, session: dict) -> None:
+        ''' removes a finished session and records it '''
+        with self.lock:
+            if self.sessions.get(session["appId"]) is not session:
+                return
+            del self.sessions[session["appId"]]
+        start = session["start"]
+        # the grace period is not part of the session
+        end = time.time() - (time.monotonic() - session["lastSeen"])
+        end = max(end, start)
+        record = {"start" : round(start), "end" : round(end), "duration" : round(end - start)}
+        backend_log(f'{session["AppName"]} session ended after {record["duration"]}s')
+        self.history.record(session["appId"], record)
+
+    def running(self) -> list:
+        ''' returns running sessions '''
+        now = time.time()
+        with self.lock:
+            return [{
+                "appId" : session["appId"],
+                "AppName" : session["AppName"],
+                "start" : round(session["start"]),
+                "elapsed" : round(now - session["start"]),
+                "processes" : len(session["pids"]),
+            } for session in self.sessions.values()]
+
+    def stop(self, app_id: str, timeout: float = 5.0) -> bool:
+        '''
+        terminates every process of a session, processes still alive after
+        timeout are killed. Store clients are never terminated.
+        '''
+        with self.lock:
+            session = self.sessions.get(app_id)
+        if session is None:
+            return False
+        processes = []
+        for pid in session["pids"]:
+            try:
+                process = psutil.Process(pid)
+            except psutil.NoSuchProcess:
+                continue
+            # pids may have been reused since the last check
+            if not is_store_client(process):
+                processes.append(process)
+        for process in processes:
+            try:
+                process.terminate()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        _, alive = psutil.wait_procs(processes, timeout=timeout)
+        for process in alive:
+            try:
+                process.kill()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        session["process"].poll()
+        session["pids"] = set()
+        session["lastSeen"] = time.monotonic()
+        self._end(session)
+        return True
+
+    def get_sessions(self, app_id: str) -> list:
+        ''' returns recorded sessions of an app '''
+        return self.history.get(app_id)
+
+launch_manager = LaunchManager()
@@ -0,0 +1,114 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Filtering, sorting and pagination of the game library '''
+import threading
+from typing import Optional
+from utils.core import normalize_text
+from library.library_store import library_store
+from library.playtime import playtime_index
+from library.search_index import search_index
+
+SORT_KEYS = ("name", "recent", "playtime", "source", "relevance", "home")
+MAX_LIMIT = 500
+
+class LibraryIndex:
+    ''' Per entry data needed by queries, rebuilt whenever the library snapshot changes '''
+    def __init__(self):
+        self.snapshot = None
+        self.by_name = []
+        self.lock = threading.Lock()
+
+    def get(self) -> list:
+        ''' returns [(app_id, game, normalized title)] sorted by title '''
+        games = library_store.get()
+        with self.lock:
+            if games is self.snapshot:
+                return self.by_name
+        entries = [(app_id, game, normalize_text(game.get("AppName", "")).casefold())
+                   for app_id, game in games.items()]
+        by_name = sorted(entries, key=lambda entry: entry[2])
+        with self.lock:
+            self.snapshot = games
+            self.by_name = by_name
+        return by_name
+
+library_index = LibraryIndex()
+
+def sort_entries(entries: list, sort: str, user_config: dict,
+                 scores: Optional[dict] = None) -> list:
+    '''
+    sorts (app_id, game, title) entries already sorted by title,
+    ties keep title order since sorted() is stable
+    '''
+    if sort == "name":
+        return entries
+    if sort == "relevance":
+        if not scores:
+            return entries
+        return sorted(entries, key=lambda entry: -scores.get(entry[0], 0))
+    if sort == "source":
+        return sorted(entries, key=lambda entry: entry[1].get("Provider",
+                                                              entry[1].get("Source", "")))
+    playtime = playtime_index.get()
+    if sort == "playtime":
+        return sorted(entries, key=lambda entry: -playtime.get(entry[0], {}).get("Playtime", 0))
+    if sort == "recent":
+        # games launched from Mukkuru go first, then steam last played date
+        recent_played = {app_id : index for index, app_id in
+                         enumerate(user_config["recentPlayed"])}
+        def recent_key(entry: tuple) -> tuple:
+            return (recent_played.get(entry[0], len(recent_played)),
+                    -playtime.get(entry[0], {}).get("LastPlayed", 0))
+        return sorted(entries, key=recent_key)
+    if sort == "home":
+        # home screen order: games launched from Mukkuru, favorites, games with art
+        recent_played = {app_id : index for index, app_id in
+                         enumerate(user_config["recentPlayed"])}
+        favorites = set(user_config["favorite"])
+        def home_key(entry: tuple) -> tuple:
+            return (recent_played.get(entry[0], len(recent_played)),
+                    entry[0] not in favorites, entry[1].get("Thumbnail") is not True)
+        return sorted(entries, key=home_key)
+    raise ValueError(f"Unknown sort key: {sort}")
+
+def query_library(user_config: dict, sort: str = "name", source: Optional[str] = None,
+                  favorite: Optional[bool] = None, hidden: Optional[bool] = False,
+                  has_art: Optional[bool] = None, term: Optional[str] = None,
+                  offset: int = 0, limit: int = 100) -> dict:
+    '''
+    returns {"total", "offset", "limit", "games": [[app_id, game]]} for a page of
+    the library. Filters set to None are ignored, hidden games are excluded by default.
+    term is matched with the fuzzy search index, sort "relevance" ranks by it.
+    '''
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort}")
+    offset = max(0, offset)
+    limit = max(0, min(limit, MAX_LIMIT))
+    entries = library_index.get()
+    favorites = set(user_config["favorite"])
+    blacklist = set(user_config["blacklist"])
+    scores = None
+    if term:
+        scores = dict(search_index.search(term, limit=None))
+    matches = []
+    for entry in entries:
+        app_id, game, _ = entry
+        if source is not None and source not in (game.get("Source"), game.get("Provider")):
+            continue
+        if favorite is not None and (app_id in favorites) != favorite:
+            continue
+        if hidden is not None and (app_id in blacklist) != hidden:
+            continue
+        if has_art is not None and (game.get("Thumbnail") is True) != has_art:
+            continue
+        if scores is not None and app_id not in scores:
+            continue
+        matches.append(entry)
+    matches = sort_entries(matches, sort, user_config, scores)
+    page = matches[offset:offset + limit]
+    return {
+        "total" : len(matches),
+        "offset" : offset,
+        "limit" : limit,
+        "games" : [[app_id, game] for app_id, game, _ in page],
+    }
@@ -0,0 +1,135 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Process wide game library, kept in memory and flushed to library.json '''
+import os
+import uuid
+from collections import deque
+from typing import Optional
+from utils.json_store import JsonStore
+
+# seconds to wait for more updates before writing library.json
+FLUSH_DELAY = 1.0
+# library versions kept for /library/changes, older clients must reload everything
+HISTORY_SIZE = 256
+
+def diff_games(old: dict, new: dict) -> dict:
+    ''' returns {"added": [ids], "removed": [ids], "modified": [ids]} between two snapshots '''
+    added = []
+    modified = []
+    for app_id, game in new.items():
+        previous = old.get(app_id)
+        if previous is None:
+            added.append(app_id)
+        # unchanged entries are usually the same object, since snapshots are copy-on-write
+        elif previous is not game and previous != game:
+            modified.append(app_id)
+    removed = [app_id for app_id in old if app_id not in new]
+    return {"added" : added, "removed" : removed, "modified" : modified}
+
+class LibraryStore(JsonStore):
+    '''
+    Serves library.json from memory. get() returns a shared snapshot that must
+    be treated as read-only, changes are made on a copy and passed to update(),
+    which swaps the snapshot and schedules a single save for bursts of updates.
+    Every change bumps version and is kept in a short history for delta refreshes.
+    '''
+    env_key = "library.json"
+    name = "library"
+
+    def __init__(self, path: Optional[str] = None, delay: float = FLUSH_DELAY):
+        super().__init__(path, delay)
+        self.games = None
+        self.mtime = None
+        # library version, library.json itself is not versioned
+        self.version = 0
+        # versions only make sense within this process
+        self.epoch = uuid.uuid4().hex
+        self.history = deque(maxlen=HISTORY_SIZE)
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self._store_path()).st_mtime_ns
+        except (OSError, TypeError):
+            return None
+
+    def _load(self, mtime: Optional[int]) -> None:
+        games = self._read()
+        if not isinstance(games, dict):
+            games = {}
+        if self.games is not None:
+            self._record(self.games, games)
+        self.games = games
+        self.mtime = mtime
+
+    def _record(self, old: dict, new: dict) -> None:
+        changes = diff_games(old, new)
+        if any(changes.values()):
+            self.version += 1
+            self.history.append((self.version, changes))
+
+    def get(self) -> dict:
+        ''' returns the library snapshot, reloaded only if library.json changed on disk '''
+        mtime = self._file_mtime()
+        with self.lock:
+            # pending updates are newer than the file
+            if self.games is None or (not self.dirty and mtime != self.mtime):
+                self._load(mtime)
+            return self.games
+
+    def update(self, games: dict) -> None:
+        ''' replaces the library snapshot and schedules a save '''
+        with self.lock:
+            if self.games is not None:
+                self._record(self.games, games)
+            self.games = games
+            self._changed()
+
+    def _dump(self) -> dict:
+        # snapshots are never modified in place, no copy is needed
+        return self.games
+
+    def _saved(self, data: dict) -> None:
+        mtime = self._file_mtime()
+        with self.lock:
+            # only record the mtime if no update arrived while writing
+            if self.games is data:
+                self.mtime = mtime
+
+    def changes(self, since: int, epoch: Optional[str] = None) -> dict:
+        '''
+        returns entries added, removed and modified after version since, with
+        "reload" set when since is not covered by the history (or another epoch)
+        '''
+        # reloads library.json first if it changed on disk
+        self.get()
+        with self.lock:
+            games = self.games
+            version = self.version
+            history = list(self.history)
+        result = {"version" : version, "epoch" : self.epoch, "reload" : False,
+                  "added" : {}, "removed" : [], "modified" : {}}
+        oldest = history[0][0] if history else version + 1
+        if (epoch is not None and epoch != self.epoch) or since > version or since < oldest - 1:
+            result["reload"] = True
+            return result
+        # whether each touched entry existed at version since
+        existed = {}
+        for change_version, changes in history:
+            if change_version <= since:
+                continue
+            for app_id in changes["added"]:
+                existed.setdefault(app_id, False)
+            for app_id in changes["removed"] + changes["modified"]:
+                existed.setdefault(app_id, True)
+        for app_id, was_present in existed.items():
+            game = games.get(app_id)
+            if game is None:
+                if was_present:
+                    result["removed"].append(app_id)
+            elif was_present:
+                result["modified"][app_id] = game
+            else:
+                result["added"][app_id] = game
+        return result
+
+library_store = LibraryStore()
@@ -0,0 +1,124 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Steam playtime and last played dates, ingested from localconfig.vdf '''
+import os
+import time
+import threading
+from utils.core import backend_log
+from library import text_vdf_parser
+from library.scan_cache import scan_cache
+from library.steam import get_steam_env, get_crossover_steam, get_steam_users, get_rungameid
+
+# lowered path of the per app block in localconfig.vdf
+APPS_PATH = ("userlocalconfigstore", "software", "valve", "steam", "apps")
+PLAYTIME_FIELDS = {"lastplayed" : "LastPlayed", "playtime" : "Playtime"}
+# seconds before get() schedules a new background refresh
+REFRESH_INTERVAL = 60
+# steam app ids stay below this, non-steam shortcut ids have the high bit set
+SHORTCUT_ID_BIT = 0x80000000
+
+def library_app_id(appid: str) -> str:
+    '''
+    maps a localconfig.vdf app key to its library id, shortcuts are stored
+    by their 32 bit id (sometimes signed) but listed by their 64 bit rungameid
+    '''
+    try:
+        value = int(appid)
+    except ValueError:
+        return appid
+    if value < 0:
+        value += 1 << 32
+    if SHORTCUT_ID_BIT <= value < 1 << 32:
+        return str(get_rungameid(value))
+    return appid
+
+def read_playtime(localconfig: str) -> dict:
+    '''
+    reads {app id: {"LastPlayed": unix time, "Playtime": minutes}} in a single
+    pass, stopping as soon as the apps block is closed. App ids are library ids.
+    '''
+    with open(localconfig, 'r', encoding='utf-8') as f:
+        apps = text_vdf_parser.read_children(f.read(), APPS_PATH, set(PLAYTIME_FIELDS))
+    playtime = {}
+    for appid, fields in apps.items():
+        app_playtime = {}
+        for key, value in fields.items():
+            try:
+                app_playtime[PLAYTIME_FIELDS[key.lower()]] = int(value)
+            except ValueError:
+                continue
+        if app_playtime:
+            playtime[library_app_id(appid)] = app_playtime
+    return playtime
+
+def merge_playtime(merged: dict, playtime: dict) -> None:
+    ''' merges playtime of another account, playtime adds up and the latest date wins '''
+    for appid, fields in playtime.items():
+        current = merged.setdefault(appid, {"LastPlayed" : 0, "Playtime" : 0})
+        current["LastPlayed"] = max(current["LastPlayed"], fields.get("LastPlayed", 0))
+        current["Playtime"] += fields.get("Playtime", 0)
+
+class PlaytimeIndex:
+    '''
+    Playtime of every steam account, files are read through scan_cache so
+    they are re-read only when they change, also across restarts
+    '''
+    def __init__(self):
+        self.signature = None
+        self.playtime = {}
+        self.checked = None
+        self.lock = threading.Lock()
+        self.refreshing = threading.Lock()
+
+    def _localconfig_files(self) -> list:
+        files = []
+        for steam in (get_steam_env(), get_crossover_steam()):
+            if steam is None:
+                continue
+            for user in get_steam_users(steam["userdata"]):
+                files.append(os.path.join(steam["userdata"], user, "config", "localconfig.vdf"))
+        return files
+
+    def refresh(self) -> None:
+        ''' re-reads localconfig.vdf files that changed since the last refresh '''
+        if not self.refreshing.acquire(blocking=False):
+            return
+        try:
+            files = []
+            signature = []
+            for file in self._localconfig_files():
+                try:
+                    st = os.stat(file)
+                    files.append(scan_cache.parse(file, read_playtime))
+                except OSError:
+                    continue
+                except ValueError as e:
+                    backend_log(f"Unable to read playtime from {file}: {e}")
+                    continue
+                signature.append((file, st.st_size, st.st_mtime_ns))
+            playtime = self.playtime
+            if signature != self.signature:
+                playtime = {}
+                for user_playtime in files:
+                    merge_playtime(playtime, user_playtime)
+            with self.lock:
+                self.signature = signature
+                self.playtime = playtime
+                self.checked = time.monotonic()
+        finally:
+            self.refreshing.release()
+
+    def refresh_async(self) -> None:
+        ''' refreshes in a background thread '''
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def get(self) -> dict:
+        ''' returns cached playtime, a stale cache is refreshed in the background '''
+        with self.lock:
+            playtime = self.playtime
+            stale = self.checked is None or time.monotonic() - self.checked > REFRESH_INTERVAL
+        if stale:
+            self.refresh_async()
+        return playtime
+
+playtime_index = PlaytimeIndex()
@@ -0,0 +1,117 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Persistent cache of parsed library manifests, keyed by path, size and mtime '''
+import os
+import functools
+import threading
+from typing import Any, Callable, Optional
+from utils.json_store import JsonStore
+
+class ScanCache(JsonStore):
+    '''
+    Stores parsed manifests so a rescan only re-parses changed files.
+    Files parsed inside run() belong to that provider, end() only drops
+    files of the providers that completed the scan.
+    '''
+    file_version = 2
+    env_key = "scan_cache.json"
+    name = "scan cache"
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__(path)
+        self.entries = {}
+        self.seen = set()
+        self.local = threading.local()
+        self.stats = {"reused" : 0, "parsed" : 0, "removed" : 0}
+        self.loaded = False
+
+    def load(self) -> None:
+        ''' loads cache from disk, a missing or outdated cache starts empty '''
+        self.loaded = True
+        self.entries = self._read() or {}
+
+    def _dump(self) -> dict:
+        return self.entries.copy()
+
+    def begin(self) -> None:
+        ''' starts a scan session '''
+        with self.lock:
+            if not self.loaded:
+                self.load()
+            self.seen = set()
+            self.stats = {"reused" : 0, "parsed" : 0, "removed" : 0}
+
+    def run(self, owner: str, func: Callable, *args) -> Any:
+        ''' returns func(*args), files it parses on this thread are owned by owner '''
+        self.local.owner = owner
+        try:
+            return func(*args)
+        finally:
+            self.local.owner = None
+
+    def bind(self, func: Callable) -> Callable:
+        '''
+        returns func running under the owner of this thread, files a provider
+        parses on its own worker threads then belong to it too
+        '''
+        owner = getattr(self.local, "owner", None)
+        if owner is None:
+            return func
+        return functools.partial(self.run, owner, func)
+
+    def end(self, owners) -> dict:
+        '''
+        finishes a scan session and saves, drops files of owners that were
+        not seen, files of providers that did not run or failed are kept
+        '''
+        owners = set(owners)
+        with self.lock:
+            for file_path, entry in list(self.entries.items()):
+                if entry.get("owner") in owners and file_path not in self.seen:
+                    del self.entries[file_path]
+                    self.stats["removed"] += 1
+                    self._changed()
+            stats = self.stats.copy()
+        self.save()
+        return stats
+
+    def parse(self, file_path: str, parser: Callable[[str], Any],
+              skip_missing: bool = False) -> Any:
+        '''
+        returns parser(file_path), reusing the cached value when the file
+        size and mtime did not change, directories work too since adding or
+        removing files changes their mtime. Values must be JSON serializable.
+        When skip_missing is True, missing files return None without parsing.
+        '''
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            if skip_missing:
+                return None
+            return parser(file_path)
+        signature = [st.st_size, st.st_mtime_ns]
+        # files parsed outside a provider, ex: loginusers.vdf, are never dropped
+        owner = getattr(self.local, "owner", None)
+        with self.lock:
+            if not self.loaded:
+                self.load()
+            cached = self.entries.get(file_path)
+            if owner is not None:
+                self.seen.add(file_path)
+            elif cached is not None:
+                owner = cached.get("owner")
+            if cached is not None and cached["signature"] == signature:
+                if cached.get("owner") != owner:
+                    # entries are replaced, never changed in place, save() shares them
+                    self.entries[file_path] = {**cached, "owner" : owner}
+                    self._changed()
+                self.stats["reused"] += 1
+                return cached["value"]
+        value = parser(file_path)
+        with self.lock:
+            self.entries[file_path] = {"signature" : signature, "value" : value, "owner" : owner}
+            self.stats["parsed"] += 1
+            self._changed()
+        return value
+
+scan_cache = ScanCache()
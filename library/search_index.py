@@ -0,0 +1,119 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Trigram index for fuzzy game title search '''
+import threading
+from collections import Counter
+from itertools import chain
+from typing import Optional
+from utils.core import normalize_text
+from library.library_store import library_store
+
+# share of query trigrams a title needs to be a fuzzy match, lower tolerates more typos
+MIN_SIMILARITY = 0.5
+
+def normalize_title(title: str) -> str:
+    ''' lowercase title without symbols or repeated spaces '''
+    return " ".join(normalize_text(title, remove_symbols=True).casefold().split())
+
+def trigrams(text: str, pad_end: bool = True) -> set:
+    '''
+    trigrams of every word, padded so word starts (and ends, when pad_end)
+    are trigrams too. Queries skip the end padding so partial words match.
+    '''
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} " if pad_end else f"  {word}"
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class SearchIndex:
+    ''' Trigram postings of library titles, updated with only the entries that changed '''
+    def __init__(self):
+        self.snapshot = None
+        self.entries = {}
+        self.titles = {}
+        self.grams = {}
+        self.postings = {}
+        self.lock = threading.Lock()
+
+    def _add(self, app_id: str, title: str) -> None:
+        grams = trigrams(title)
+        self.titles[app_id] = title
+        self.grams[app_id] = grams
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(app_id)
+
+    def _remove(self, app_id: str) -> None:
+        del self.titles[app_id]
+        for gram in self.grams.pop(app_id):
+            postings = self.postings[gram]
+            postings.discard(app_id)
+            if not postings:
+                del self.postings[gram]
+
+    def sync(self, games: Optional[dict] = None) -> None:
+        '''
+        applies library changes, entries are compared by identity since
+        snapshots are copy-on-write
+        '''
+        if games is None:
+            games = library_store.get()
+        with self.lock:
+            if games is self.snapshot:
+                return
+            for app_id in [app_id for app_id in self.entries if app_id not in games]:
+                del self.entries[app_id]
+                self._remove(app_id)
+            for app_id, game in games.items():
+                if self.entries.get(app_id) is game:
+                    continue
+                self.entries[app_id] = game
+                title = normalize_title(game.get("AppName", ""))
+                if self.titles.get(app_id) == title:
+                    continue
+                if app_id in self.titles:
+                    self._remove(app_id)
+                self._add(app_id, title)
+            self.snapshot = games
+
+    def search(self, term: str, limit: Optional[int] = 50, games: Optional[dict] = None) -> list:
+        '''
+        returns [(app_id, score)] best first: title prefix, word prefix,
+        substring and then typo tolerant matches ranked by trigram similarity
+        '''
+        self.sync(games)
+        query = normalize_title(term)
+        if not query:
+            return []
+        query_grams = trigrams(query, pad_end=False)
+        with self.lock:
+            counts = Counter(chain.from_iterable(self.postings.get(gram, ())
+                                                 for gram in query_grams))
+            # substrings share every query trigram except the two padded word
+            # start ones, anything below both bounds can be skipped right away
+            min_count = min(len(query_grams) - 2, MIN_SIMILARITY * len(query_grams))
+            ranked = []
+            for app_id, count in counts.items():
+                if count < min_count:
+                    continue
+                title = self.titles[app_id]
+                similarity = count / len(query_grams)
+                if title.startswith(query):
+                    tier = 0
+                elif f" {query}" in f" {title}":
+                    tier = 1
+                elif query in title:
+                    tier = 2
+                elif similarity >= MIN_SIMILARITY:
+                    tier = 3
+                else:
+                    continue
+                ranked.append((tier, -similarity, len(title), title, app_id))
+        ranked.sort()
+        if limit is not None:
+            ranked = ranked[:limit]
+        # higher is better, the tier dominates and similarity breaks ties
+        return [(app_id, round(3 - tier - negative_similarity, 3))
+                for tier, negative_similarity, _, _, app_id in ranked]
+
+search_index = SearchIndex()
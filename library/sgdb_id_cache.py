@@ -0,0 +1,76 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Persistent cache of SteamGridDB game ids, shared by every asset type of a game '''
+import time
+from typing import Callable, Optional
+from utils.json_store import JsonStore, SAVE_DELAY
+from library.search_index import normalize_title
+
+# seconds a resolved id is reused before it is looked up again
+ID_TTL = 30 * 24 * 3600
+# games SteamGridDB does not know are retried sooner, they may be added later
+MISSING_TTL = 24 * 3600
+
+def cache_key(platform: str, app_id, title: str) -> str:
+    ''' steam games are keyed by app id, anything else by normalized title '''
+    if app_id != 0 and platform == "steam":
+        return f"steam/{app_id}"
+    return f"title/{normalize_title(title)}"
+
+class SgdbIdCache(JsonStore):
+    ''' Maps cache keys to [game id, expiry time], game id 0 marks a game that was not found '''
+    file_version = 1
+    env_key = "sgdb_ids.json"
+    name = "sgdb id cache"
+
+    def __init__(self, path: Optional[str] = None, delay: float = SAVE_DELAY):
+        super().__init__(path, delay)
+        self.entries = None
+        self.stats = {"hits" : 0, "lookups" : 0}
+
+    def _load(self) -> None:
+        self.entries = self._read() or {}
+
+    def get(self, key: str) -> Optional[int]:
+        ''' returns a cached game id, 0 for games not found and None if unknown or expired '''
+        with self.lock:
+            if self.entries is None:
+                self._load()
+            entry = self.entries.get(key)
+            if entry is None or entry[1] < time.time():
+                return None
+            return entry[0]
+
+    def set(self, key: str, game_id: int) -> None:
+        ''' caches a game id, 0 caches a game that was not found '''
+        ttl = ID_TTL if game_id != 0 else MISSING_TTL
+        with self.lock:
+            if self.entries is None:
+                self._load()
+            self.entries[key] = [game_id, time.time() + ttl]
+            self._changed()
+
+    def resolve(self, key: str, lookup: Callable[[], Optional[int]]) -> Optional[int]:
+        '''
+        returns the cached game id of key, calls lookup() when it is unknown or
+        expired. lookup() returns None when it failed, that is not cached.
+        '''
+        game_id = self.get(key)
+        if game_id is not None:
+            with self.lock:
+                self.stats["hits"] += 1
+            return game_id
+        game_id = lookup()
+        with self.lock:
+            self.stats["lookups"] += 1
+        if game_id is not None:
+            self.set(key, game_id)
+        return game_id
+
+    def _dump(self) -> dict:
+        ''' expired entries are dropped '''
+        now = time.time()
+        self.entries = {key : entry for key, entry in self.entries.items() if entry[1] >= now}
+        return self.entries.copy()
+
+sgdb_id_cache = SgdbIdCache()
@@ -2,7 +2,6 @@
 # Licensed under the MIT License
 ''' Steam library module '''
 import struct
-import glob
 import os
 import sys
 import re
@@ -11,12 +10,13 @@ import platform
 from pathlib import Path
 from functools import lru_cache
 from typing import Optional
-# third-party imports
-import vdf
+from concurrent.futures import ThreadPoolExecutor
 
-from utils.core import backend_log, get_config, update_config
-from library import binary_vdf_parser
+from utils.core import backend_log, get_config, update_config, atomic_write
+from library import binary_vdf_parser, text_vdf_parser
 from library import wrapper, common
+from library.scan_cache import scan_cache
+from library.compat_tools import compat_tools
 
 APP_BASE_NAME = os.path.basename(sys.argv[0])
 
@@ -39,54 +39,113 @@ hardcoded_exclusions = ["Proton Experimental",
                         "Proton BattlEye Runtime",
                         APP_BASE_NAME]
 
+# shortcuts.vdf fields used to build library entries
+SHORTCUT_FIELDS = ("AppName", "Exe", "StartDir", "appid", "icon")
+
+# userdata folders are named after the account id, which is the SteamID64 minus this
+STEAM_ID64_BASE = 76561197960265728
+
+# steam type -> rungameid of the Mukkuru shortcut of the logged in account
+mukkuru_shortcut = {}
+
 def set_shortcut_launch_options(steam_env: dict, appid: str, new_options:str) -> bool:
     ''' edit launch options of non-steam games '''
+    return set_shortcut_launch_options_batch(steam_env, {appid: new_options}).get(appid, False)
+
+def set_shortcut_launch_options_batch(steam_env: dict, launch_options: dict) -> dict:
+    ''' edit launch options of several non-steam games, shortcuts.vdf is written once '''
     if steam_env is None:
         steam_env = get_steam_env()
+    results = {appid: False for appid in launch_options}
     games = get_non_steam_games(steam_env)
-    game = games[appid]
-    if "Index" not in game:
-        backend_log("Unable to access steam shortcut Index, outdated library.json, re-scan")
-        return False
-    shortcut_index = game["Index"]
+    # shortcuts of other accounts are stored in their own shortcuts.vdf
+    edits = {}
+    for appid, new_options in launch_options.items():
+        game = games.get(appid)
+        if game is None or "Index" not in game:
+            backend_log("Unable to access steam shortcut Index, outdated library.json, re-scan")
+            continue
+        file = get_user_shortcuts(steam_env, game.get("SteamUser"))
+        edits.setdefault(file, {})[appid] = (game["Index"], new_options)
     parser = binary_vdf_parser.BinaryVDFParser(None)
-    file = steam_env["shortcuts"]
-    data = parser.parse_shortcut(file)
-    data['shortcuts'][shortcut_index]["LaunchOptions"] = new_options
-    parser.save_shortcut(file, data)
-    return True
+    for file, user_edits in edits.items():
+        try:
+            data = parser.parse_shortcut(file)
+        except OSError as e:
+            backend_log(f"Failed to read {file}: {e}")
+            continue
+        shortcuts = data.get("shortcuts", {})
+        edited = []
+        for appid, (index, new_options) in user_edits.items():
+            if index not in shortcuts:
+                backend_log(f"Unable to set launch options, shortcut {index} not found in {file}")
+                continue
+            shortcuts[index]["LaunchOptions"] = new_options
+            edited.append(appid)
+        if not edited:
+            continue
+        try:
+            parser.save_shortcut(file, data)
+        except OSError as e:
+            backend_log(f"Failed to write {file}: {e}")
+            continue
+        for appid in edited:
+            results[appid] = True
+    return results
 
 def set_launch_options(steam: dict, appid: str, new_options: str) -> bool:
     """Set the LaunchOptions for a given appid in localconfig.vdf"""
+    return set_launch_options_batch(steam, {appid: new_options}).get(appid, False)
+
+def set_launch_options_batch(steam: dict, launch_options: dict) -> dict:
+    """
+    Set the LaunchOptions of several appids in localconfig.vdf, the file is read
+    and written once and only the edited values are spliced into it
+    """
     if steam is None:
         steam = get_steam_env()
-    vdf_path = steam["shortcuts"].replace("shortcuts.vdf", "localconfig.vdf")
+    results = {appid: False for appid in launch_options}
+    vdf_path = get_user_file(steam, "localconfig.vdf")
+    if vdf_path is None:
+        backend_log("Unable to set launch options, no steam user found")
+        return results
     backend_log(f"editing {vdf_path}")
+    apps_path = ("UserLocalConfigStore", "Software", "Valve", "Steam", "apps")
     try:
-        with open(vdf_path, 'r', encoding='utf-8') as f:
-            data = vdf.load(f)
+        with open(vdf_path, 'r', encoding='utf-8', newline='') as f:
+            content = f.read()
+        apps = text_vdf_parser.read_children(content, tuple(key.lower() for key in apps_path),
+                                             {"launchoptions"})
+        # apps Steam has no entry for are left alone, as with a missing key before
+        values = {}
+        for appid, new_options in launch_options.items():
+            if appid in apps:
+                values[(*apps_path, appid, "LaunchOptions")] = new_options
+            else:
+                backend_log(f"Unable to set launch options, {appid} not found in {vdf_path}")
+        if not values:
+            return results
+        content = text_vdf_parser.patch_values(content, values)
     except (FileNotFoundError, PermissionError, ValueError) as e:
-        print(f"Failed to read {vdf_path}: {e}")
-        return False
+        backend_log(f"Failed to read {vdf_path}: {e}")
+        return results
     try:
-        software_dict = data["UserLocalConfigStore"]["Software"]
-        if "valve" in software_dict:
-            valve_dict = software_dict["valve"]
-        else:
-            valve_dict = software_dict["Valve"]
-        valve_dict["Steam"]["apps"][appid]["LaunchOptions"] = new_options
-    except KeyError:
-        backend_log("Unable to set launch options, key error")
-        return False
-    with open(vdf_path, "w", encoding="utf-8") as f:
-        vdf.dump(data, f, pretty=True)
-    return True
+        atomic_write(vdf_path, content)
+    except OSError as e:
+        backend_log(f"Failed to write {vdf_path}: {e}")
+        return results
+    for key_path in values:
+        results[key_path[-2]] = True
+    return results
+
+# parse_acf only needs these keys, parsing stops once they are read
+ACF_KEYS = {("AppState", "appid"), ("AppState", "name"), ("AppState", "installdir")}
 
 def parse_acf(acf_path: str) -> dict:
     """Parse an ACF file to get game info"""
     try:
         with open(acf_path, 'r', encoding='utf-8') as f:
-            data = parse_text_vdf(f.read())
+            data = text_vdf_parser.loads(f.read(), keys=ACF_KEYS)
     except (FileNotFoundError, PermissionError, struct.error, ValueError, IndexError) as e:
         backend_log(f"Error reading ACF file {acf_path}: {e}")
         return {}
@@ -98,103 +157,121 @@ def parse_acf(acf_path: str) -> dict:
     return acf
 
 def parse_text_vdf(vdf_text) -> dict:
-    """Simple text VDF parser (simplified version)"""
-    # This is a simplified version - for full parsing you might want to use a proper VDF parser
-    lines = vdf_text.split('\n')
-    stack = []
-    current = {}
-    result = current
-    key = None# Prevent crash
-    for line in lines:
-        line = line.strip()
-        if not line or line.startswith('//'):
-            continue
-        if line == '{':
-            new_dict = {}
-            stack.append((current, key))
-            current[key] = new_dict
-            current = new_dict
-        elif line == '}':
-            if stack:
-                current, key = stack.pop()
-        else:
-            parts = line.split('"')
-            if len(parts) >= 3:
-                key = parts[1]
-                value = parts[3] if len(parts) >= 4 else ""
-                current[key] = value
-    return result
+    """Parse text VDF into nested dictionaries"""
+    return text_vdf_parser.loads(vdf_text)
+
+def read_shortcuts(shortcuts_file: str) -> list:
+    """Read [index, fields] pairs of every shortcut in a shortcuts.vdf file"""
+    parser = binary_vdf_parser.BinaryVDFParser(None)
+    return [[index, fields] for index, fields in
+            parser.iter_shortcuts(shortcuts_file, set(SHORTCUT_FIELDS))]
+
+def get_user_file(steam_env: dict, filename: str, user: Optional[str] = None) -> Optional[str]:
+    """
+    Get the path of a file in the config folder of a steam user, the account
+    currently logged in when None, resolved on every call since get_steam_env is cached
+    """
+    if user is None:
+        user = get_current_steam_user(steam_env["userdata"])
+        if user is None:
+            return None
+    return os.path.join(steam_env["userdata"], user, "config", filename)
 
+def get_user_shortcuts(steam_env: dict, user: Optional[str]) -> Optional[str]:
+    """Get shortcuts.vdf path of a steam user, the active user when None"""
+    return get_user_file(steam_env, "shortcuts.vdf", user)
+
+def read_user_shortcuts(steam_env: dict, user: str) -> list:
+    """Read shortcuts of a steam user, an empty list if the user has none"""
+    file = get_user_shortcuts(steam_env, user)
+    try:
+        # parsed shortcuts are reused while shortcuts.vdf stays unchanged
+        return scan_cache.parse(file, read_shortcuts, skip_missing=True) or []
+    except (FileNotFoundError, PermissionError, struct.error, ValueError, IndexError) as e:
+        backend_log(f"Error processing {file}: {e}")
+        return []
 
 def get_non_steam_games(steam_env: dict) -> dict:
-    """Get Non-Steam games from shortcuts.vdf files"""
+    """Get Non-Steam games from the shortcuts.vdf files of every steam user"""
     games = {}
     if steam_env is None:
         return games
     steam_launch_path = steam_env["launchPath"]
+    # active user goes first so its shortcuts win over other accounts
+    active_user = get_current_steam_user(steam_env["userdata"])
+    users = get_steam_users(steam_env["userdata"])
+    if active_user in users:
+        users.remove(active_user)
+        users.insert(0, active_user)
+    if not users:
+        return games
+    workers = max(1, min(len(users), get_config()["cores"]))
+    # worker threads parse on behalf of the provider running this scan
+    read_shortcuts_of = scan_cache.bind(lambda user: read_user_shortcuts(steam_env, user))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        user_shortcuts = list(executor.map(read_shortcuts_of, users))
+    for user, shortcuts in zip(users, user_shortcuts):
+        grid_path = os.path.join(steam_env["userdata"], user, "config", "grid")
+        for shorcut_index, shortcut in shortcuts:
+            app_name = shortcut.get("AppName", "")
+            app_exe = shortcut.get("Exe", "")
+            if "moondeckrun" in app_exe:
+                continue
+            app_dir = shortcut.get("StartDir", "")
+            #app_options = shortcut.get("LaunchOptions", "")
 
-    shortcuts_pattern = steam_env["shortcuts"]
-    shortcuts_files = glob.glob(shortcuts_pattern)
-    for file in shortcuts_files:
-        try:
-            # Read and parse the binary VDF file
-            data = binary_vdf_parser.BinaryVDFParser(None).parse_shortcut(file)
-            shortcuts = data.get("shortcuts", {})
-            # Iterate over each shortcut, 'key' discarded with _
-            for shorcut_index, shortcut in shortcuts.items():
-                if not isinstance(shortcut, dict):
-                    continue
-                app_name = shortcut.get("AppName", "")
-                app_exe = shortcut.get("Exe", "")
-                if "moondeckrun" in app_exe:
-                    continue
-                app_dir = shortcut.get("StartDir", "")
-                #app_options = shortcut.get("LaunchOptions", "")
-
+            try:
                 app_id = int(shortcut.get("appid", 0)) if shortcut.get("appid") else 0
-                app_id = str(get_rungameid(app_id))
-                if app_name in hardcoded_exclusions:
-                    if app_name == APP_BASE_NAME:
-                        user_config = get_config()
-                        user_config["mukkuru_steam_id"] = app_id
-                        update_config(user_config)
-                    backend_log(f"Skipping {app_name} ({app_id}) due to hardcoded exclusion")
-                    continue
-                icon = shortcut.get("icon", "")
-                #if app_exe.strip('"').endswith(".exe") and platform.system() == "Linux":
-                #    needs_proton = True
-
-                if app_name and app_id:
-                    games[app_id] = {
-                        "AppName": app_name,
-                        "icon": icon,
-       #                 "Exe": app_exe,
-                        "StartDir": app_dir,
-       #                 "LaunchOptions": app_options,
-                        "Exe": os.path.join(steam_launch_path),
-                        "LaunchOptions" : f'steam://rungameid/{app_id}',
-                        "Hero": os.path.join(steam_env["gridPath"], app_id+"_hero.jpg"),
-                        "Logo": os.path.join(steam_env["gridPath"], app_id+"_logo.png"),
-                        "Cover": os.path.join(steam_env["gridPath"], app_id+"p.jpg"),
-                        "Source" : "non-steam",
-                        "Index" : shorcut_index,
-                        #"Proton" : needs_proton,
-                        "Type" : steam_env["type"]
-                    }
-        except (FileNotFoundError, PermissionError, struct.error, ValueError, IndexError) as e:
-            backend_log(f"Error processing {file}: {e}")
+            except (ValueError, TypeError) as e:
+                backend_log(f"Invalid shortcut appid for {app_name}: {e}")
+                continue
+            app_id = str(get_rungameid(app_id))
+            if app_name in hardcoded_exclusions:
+                if app_name == APP_BASE_NAME and user == active_user:
+                    # providers run on worker threads, config is saved by the scan
+                    mukkuru_shortcut[steam_env["type"]] = app_id
+                backend_log(f"Skipping {app_name} ({app_id}) due to hardcoded exclusion")
+                continue
+            icon = shortcut.get("icon", "")
+            #if app_exe.strip('"').endswith(".exe") and platform.system() == "Linux":
+            #    needs_proton = True
+
+            if app_name and app_id and app_id not in games:
+                games[app_id] = {
+                    "AppName": app_name,
+                    "icon": icon,
+   #                 "Exe": app_exe,
+                    "StartDir": app_dir,
+   #                 "LaunchOptions": app_options,
+                    "Exe": os.path.join(steam_launch_path),
+                    "LaunchOptions" : f'steam://rungameid/{app_id}',
+                    "Hero": os.path.join(grid_path, app_id+"_hero.jpg"),
+                    "Logo": os.path.join(grid_path, app_id+"_logo.png"),
+                    "Cover": os.path.join(grid_path, app_id+"p.jpg"),
+                    "Source" : "non-steam",
+                    "Index" : shorcut_index,
+                    "SteamUser" : user,
+                    # rungameid only starts shortcuts of the account logged in
+                    "Launchable" : user == active_user,
+                    #"Proton" : needs_proton,
+                    "Type" : steam_env["type"]
+                }
     return games
 
 def get_steam_libraries(vdf_path) -> list:
     """Get Steam library paths from libraryfolders.vdf"""
+    return list(get_steam_library_index(vdf_path).keys())
+
+def get_steam_library_index(vdf_path) -> dict:
+    """Get {steamapps path: [installed appids]} from libraryfolders.vdf"""
     try:
         with open(vdf_path, 'r', encoding='utf-8') as f:
-            data = parse_text_vdf(f.read())
+            data = text_vdf_parser.loads(f.read())
     except (FileNotFoundError, PermissionError, struct.error, ValueError, IndexError) as e:
         backend_log(f"Error reading libraryfolders.vdf: {e}")
-        return []
+        return {}
     library_folders = data.get("libraryfolders", {})
-    paths = []
+    libraries = {}
     for key, val in library_folders.items():
         if key.isdigit():  # Library folders have numerical keys
             if isinstance(val, dict):
@@ -202,12 +279,14 @@ def get_steam_libraries(vdf_path) -> list:
                 backend_log(f"steam folder_path : {folder_path}")
                 if folder_path:
                     norm_path = os.path.normpath(os.path.join(folder_path, "steamapps"))
-                    paths.append(norm_path)
+                    apps = val.get("apps", {})
+                    appids = list(apps.keys()) if isinstance(apps, dict) else []
+                    libraries.setdefault(norm_path, []).extend(appids)
     # Include main Steam folder (this is likely unnnecesary)
     #main_folder = os.path.join(steam_env["path"], "steamapps")
     #if not main_folder in paths:
     #    paths.append(main_folder)
-    return paths
+    return libraries
 
 def get_rungameid(shortcut_appid: int) -> int:
     """Turn a 32‑bit shortcut AppID into the 64‑bit value."""
@@ -216,13 +295,16 @@ def get_rungameid(shortcut_appid: int) -> int:
 def get_proton_command(app_id: str, command: str, user_config: dict) -> str:
     ''' run game using proton '''
     steam = get_steam_env()
-    proton_list = get_proton_list()
-    proton_version = proton_list[0]
+    proton_list = get_compat_tools(steam)
+    if not proton_list:
+        backend_log("proton runtime not found")
+        return command
+    tool = proton_list[0]
     if app_id in user_config["protonConfig"]:
-        proton_version = user_config["protonConfig"][app_id]
+        tool = compat_tools.get(user_config["protonConfig"][app_id]) or tool
     else:
-        backend_log(f"Using default {proton_version}")
-    proton = os.path.join(steam["path"], "steamapps", "common", proton_version, "proton")
+        backend_log(f"Using default {tool['name']}")
+    proton = tool["proton"]
     if not Path(proton).exists():
         backend_log("proton runtime not found")
         return command
@@ -236,17 +318,21 @@ def get_proton_command(app_id: str, command: str, user_config: dict) -> str:
         proton = f'"{proton}"'
     return f"{proton} run {command}"
 
+def get_compat_tools(steam: Optional[dict]) -> list:
+    ''' list compatibility tools of every library and compatibilitytools.d, default first '''
+    if steam is None:
+        return []
+    libraries = scan_cache.parse(steam["libraryFile"], get_steam_library_index) or {}
+    return compat_tools.refresh(steam["path"], list(libraries.keys()))
+
 def get_proton_list() -> list:
     ''' list proton builds '''
-    proton_builds = []
-    steam = get_steam_env()
-    if steam is None:
-        return proton_builds
-    proton_root = os.path.join(steam["path"], "steamapps", "common")
-    for proton_build in os.listdir(proton_root):
-        if proton_build.startswith("Proton "):
-            proton_builds.append(proton_build)
-    return proton_builds
+    return [tool["name"] for tool in get_compat_tools(get_steam_env())]
+
+def list_app_manifests(steamapps_path: str) -> list:
+    """Get appids of every appmanifest_*.acf in a steamapps folder"""
+    return [acf_file.name[len("appmanifest_"):-len(".acf")]
+            for acf_file in Path(steamapps_path).glob("appmanifest_*.acf")]
 
 def get_steam_games(steam: dict) -> dict:
     """ Get steam games """
@@ -257,13 +343,24 @@ def get_steam_games(steam: dict) -> dict:
     steam_path = steam["path"]
     steam_launch_path = steam["launchPath"]
 
-    libraries = get_steam_libraries(steam_library_file)
+    libraries = scan_cache.parse(steam_library_file, get_steam_library_index) or {}
     library_cache = os.path.join(steam_path, "appcache", "librarycache")
     # Scan Steam games
-    for lib in libraries:
+    for lib, listed_appids in libraries.items():
         print(f"steam lib {lib}")
-        for acf_file in Path(lib).glob("appmanifest_*.acf"):
-            acf = parse_acf(str(acf_file))
+        # unplugged sd cards or external drives are skipped without blocking the scan
+        if not common.is_path_available(lib):
+            backend_log(f"steam library {lib} is not available, skipping")
+            continue
+        # the apps list is used as index, the folder is only globbed again
+        # when manifests were added or removed since the last scan
+        appids = set(listed_appids)
+        appids.update(scan_cache.parse(lib, list_app_manifests, skip_missing=True) or [])
+        for listed_appid in sorted(appids):
+            acf_file = os.path.join(lib, f"appmanifest_{listed_appid}.acf")
+            acf = scan_cache.parse(acf_file, parse_acf, skip_missing=True)
+            if not acf:
+                continue
             app_id = acf["appid"]
             name = acf["name"]
 
@@ -344,17 +441,63 @@ def get_steam_avatar(artwork_dir: str) -> bool:
         return False
     return get_steam_avatar_from_cache(artwork_dir, steam_username)
 
-def map_shortcuts_path(shortcut_path: str) -> Optional[str]:
-    ''' find shortcuts path '''
-    find_stuser = shortcut_path.split('*')[0]
-    st_user = None
+def read_loginusers(loginusers_file: str) -> Optional[str]:
+    """Get account id of the most recent user in loginusers.vdf"""
+    try:
+        with open(loginusers_file, 'r', encoding='utf-8') as f:
+            users = text_vdf_parser.loads(f.read()).get("users", {})
+    except (FileNotFoundError, PermissionError, ValueError) as e:
+        backend_log(f"Error reading loginusers.vdf: {e}")
+        return None
+    recent = None
+    for steam_id, user in users.items():
+        if not steam_id.isdigit() or not isinstance(user, dict):
+            continue
+        timestamp = user.get("Timestamp", "0")
+        timestamp = int(timestamp) if timestamp.isdigit() else 0
+        most_recent = user.get("MostRecent", user.get("mostrecent", "0")) == "1"
+        if recent is None or (most_recent, timestamp) > recent[0]:
+            recent = ((most_recent, timestamp), str(int(steam_id) - STEAM_ID64_BASE))
+    return recent[1] if recent else None
+
+def get_active_steam_user(userdata: str) -> Optional[str]:
+    """Get account id of the user logged in Steam, cached until loginusers.vdf changes"""
+    loginusers_file = os.path.join(os.path.dirname(userdata), "config", "loginusers.vdf")
+    return scan_cache.parse(loginusers_file, read_loginusers, skip_missing=True)
+
+def get_current_steam_user(userdata: str) -> Optional[str]:
+    """Get account id of the logged in user, the first user with userdata if unknown"""
+    users = get_steam_users(userdata)
+    if not users:
+        return None
+    active_user = get_active_steam_user(userdata)
+    return active_user if active_user in users else users[0]
+
+def save_mukkuru_steam_id() -> None:
+    """Saves the id of the Mukkuru shortcut found by the last scan, if it changed"""
+    app_id = mukkuru_shortcut.get("NATIVE", mukkuru_shortcut.get("CROSSOVER"))
+    mukkuru_shortcut.clear()
+    if app_id is None:
+        return
+    user_config = get_config()
+    if user_config.get("mukkuru_steam_id") != app_id:
+        user_config["mukkuru_steam_id"] = app_id
+        update_config(user_config)
+
+def get_steam_users(userdata: str) -> list:
+    """Get account ids of every steam user with a userdata folder"""
     # This will prevent annoying .DS_Store from breaking the path detection
     try:
-        for file in os.listdir(find_stuser):
-            if file.isdigit() and file != "0":
-                st_user = file
-                break
-    except FileNotFoundError:
+        return sorted((file for file in os.listdir(userdata) if file.isdigit() and file != "0"),
+                      key=int)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+def map_shortcuts_path(shortcut_path: str) -> Optional[str]:
+    ''' find shortcuts path, of the active user when it has userdata '''
+    find_stuser = shortcut_path.split('*')[0]
+    st_user = get_current_steam_user(os.path.normpath(find_stuser))
+    if st_user is None:
         return None
     return shortcut_path.replace("*", st_user, 1)
 
@@ -381,6 +524,7 @@ def get_crossover_steam() -> Optional[dict]:
     if not Path(steam["libraryFile"]).is_file():
         backend_log("(CrossOver) Steam is not available")
         return None
+    steam["userdata"] = os.path.join(steam["path"], "userdata")
     steam["gridPath"] = steam["shortcuts"].replace("shortcuts.vdf", "grid", 1)
     steam["config.vdf"] = os.path.join(steam["path"], "config", "config.vdf")
     steam["type"] = "CROSSOVER"
@@ -433,6 +577,7 @@ def get_steam_env() -> Optional[dict]:
     if not Path(steam["libraryFile"]).is_file():
         backend_log("Steam is not available")
         return None
+    steam["userdata"] = os.path.join(steam["path"], "userdata")
     steam["gridPath"] = steam["shortcuts"].replace("shortcuts.vdf", "grid", 1)
     steam["config.vdf"] = os.path.join(steam["path"], "config", "config.vdf")
     steam["type"] = "NATIVE"
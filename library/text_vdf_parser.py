@@ -0,0 +1,383 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Tokenizer and parser for text valve data files (vdf, acf) '''
+import re
+import platform
+import struct
+from functools import lru_cache
+from typing import Iterator, Optional
+
+TOKEN_STRING = 1
+TOKEN_OPEN = 2
+TOKEN_CLOSE = 3
+TOKEN_CONDITION = 4
+TOKEN_BARE = 5
+_TOKEN_ERROR = 6
+_TOKEN_END = 7
+
+# Every match consumes leading whitespace/comments plus exactly one token,
+# group numbers match the TOKEN_* constants
+_TOKEN_RE = re.compile(r'''
+    [\s\ufeff]*(?://[^\n]*[\s\ufeff]*)*
+    (?:
+        "([^"\\]*(?:\\.[^"\\]*)*)"
+        |(\{)
+        |(\})
+        |(\[[^\]\n]*\])
+        |([^\s{}"\[\]]+)
+        |(.)
+        |(\Z)
+    )
+''', re.VERBOSE | re.DOTALL)
+
+_MISSING = object()
+
+_ESCAPE_RE = re.compile(r'\\(.)', re.DOTALL)
+_ESCAPES = {"n" : "\n", "t" : "\t", "\\" : "\\", '"' : '"'}
+
+def _unescape(match: re.Match) -> str:
+    char = match.group(1)
+    return _ESCAPES.get(char, "\\" + char)
+
+def unescape(raw: str) -> str:
+    ''' resolves vdf escape sequences, unknown sequences are kept as-is '''
+    if "\\" not in raw:
+        return raw
+    return _ESCAPE_RE.sub(_unescape, raw)
+
+@lru_cache(maxsize=1)
+def platform_flags() -> frozenset:
+    ''' condition flags that are true on this system, ex: [$WIN32] on Windows '''
+    system = platform.system()
+    if system == "Windows":
+        flags = {"WIN32", "WINDOWS"}
+        if struct.calcsize("P") == 8:
+            flags.add("WIN64")
+    elif system == "Darwin":
+        flags = {"OSX", "POSIX"}
+    else:
+        flags = {"LINUX", "POSIX"}
+    return frozenset(flags)
+
+def condition_matches(condition: str) -> bool:
+    '''
+    evaluates a [$PLATFORM] conditional such as [$WIN32], [!$OSX] or
+    [$WIN32||$LINUX] against the running system, && binds tighter than ||
+    '''
+    flags = platform_flags()
+    def term_matches(term: str) -> bool:
+        term = term.strip()
+        negated = term.startswith("!")
+        return (term.lstrip("!").lstrip("$") in flags) != negated
+    return any(all(term_matches(term) for term in group.split("&&"))
+               for group in condition.strip("[]").split("||"))
+
+def escape(value: str) -> str:
+    ''' escapes a string so it can be written between quotes '''
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+def tokenize(text: str, pos: int = 0) -> Iterator[tuple]:
+    '''
+    Lazily yields (kind, value, start, end) tokens, start/end being the span
+    of the token in text (quotes included). Bare strings are reported as
+    TOKEN_STRING, comments and whitespace are skipped.
+    '''
+    for m in _TOKEN_RE.finditer(text, pos):
+        kind = m.lastindex
+        if kind == _TOKEN_END:
+            return
+        start, end = m.span(kind)
+        if kind == TOKEN_STRING:
+            yield TOKEN_STRING, unescape(m.group(kind)), start - 1, end + 1
+        elif kind == TOKEN_BARE:
+            yield TOKEN_STRING, m.group(kind), start, end
+        elif kind == _TOKEN_ERROR:
+            raise ValueError(f"Unexpected {m.group(kind)!r} at offset {start}")
+        else:
+            yield kind, m.group(kind), start, end
+
+def _match_tokens(text: str) -> Iterator[tuple]:
+    ''' yields (kind, value, offset) for every token of text, errors raise ValueError '''
+    for m in _TOKEN_RE.finditer(text):
+        kind = m.lastindex
+        if kind == TOKEN_STRING:
+            value = m.group(kind)
+            yield TOKEN_STRING, unescape(value) if "\\" in value else value, m.start(kind)
+        elif kind == TOKEN_BARE:
+            yield TOKEN_STRING, m.group(kind), m.start(kind)
+        elif kind == _TOKEN_ERROR:
+            raise ValueError(f"Unexpected {m.group(kind)!r} at offset {m.start(kind)}")
+        elif kind == _TOKEN_END:
+            return
+        else:
+            yield kind, m.group(kind), m.start(kind)
+
+def _parse_lines(text: str) -> Optional[dict]:
+    '''
+    Parses text written the way Steam does, one "key" "value" pair, "key"
+    or brace per line, splitting lines instead of matching tokens. Returns
+    None on anything else (comments, conditionals, escaped quotes, errors),
+    the tokenizer parses those files.
+    '''
+    result = {}
+    current = result
+    stack = []
+    key = None
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        if line == "{":
+            if key is None:
+                return None
+            nested = current.get(key)
+            if not isinstance(nested, dict):
+                nested = {}
+                current[key] = nested
+            stack.append(current)
+            current = nested
+            key = None
+            continue
+        if line == "}":
+            if not stack or key is not None:
+                return None
+            current = stack.pop()
+            continue
+        parts = line.split('"')
+        if key is not None or parts[0]:
+            return None
+        if len(parts) == 5 and not parts[4] and not parts[2].strip():
+            if "\\" in line:
+                if '\\"' in line:
+                    return None
+                current[unescape(parts[1])] = unescape(parts[3])
+            else:
+                current[parts[1]] = parts[3]
+        elif len(parts) == 3 and not parts[2]:
+            key = unescape(parts[1])
+        else:
+            return None
+    if key is not None or stack:
+        return None
+    return result
+
+def _build(tokens, keys: Optional[set]) -> dict:
+    ''' builds nested dictionaries from (kind, value, offset) tokens, see loads '''
+    result = {}
+    current = result
+    stack = []
+    path = []
+    key = None
+    # (dict, key, previous value or _MISSING) of the last value, undone by a false conditional
+    last = None
+    skip_block = False
+    done = False
+    pending = set(keys) if keys else None
+    for kind, value, offset in tokens:
+        if kind == TOKEN_CONDITION:
+            if condition_matches(value):
+                continue
+            if key is not None:
+                # "key" [$COND] { ... }
+                skip_block = True
+            elif last is not None:
+                container, last_key, previous = last
+                if previous is _MISSING:
+                    del container[last_key]
+                else:
+                    container[last_key] = previous
+                if pending is not None:
+                    pending.add((*path, last_key))
+                    done = False
+            last = None
+            continue
+        if done:
+            break
+        last = None
+        if kind == TOKEN_STRING:
+            if key is None:
+                key = value
+                continue
+            if skip_block:
+                skip_block = False
+                key = None
+                continue
+            last = (current, key, current.get(key, _MISSING))
+            current[key] = value
+            if pending is not None:
+                pending.discard((*path, key))
+                # a conditional may still follow the value
+                done = not pending
+            key = None
+        elif kind == TOKEN_OPEN:
+            if key is None:
+                raise ValueError(f"Unexpected {{ at offset {offset}")
+            nested = current.get(key)
+            if skip_block:
+                # parsed into a detached dict and dropped
+                nested = {}
+                skip_block = False
+            elif not isinstance(nested, dict):
+                nested = {}
+                current[key] = nested
+            stack.append(current)
+            if pending is not None:
+                path.append(key)
+            current = nested
+            key = None
+        else:
+            if not stack:
+                raise ValueError(f"Unexpected }} at offset {offset}")
+            current = stack.pop()
+            if pending is not None:
+                path.pop()
+            key = None
+    return result
+
+def loads(text: str, keys: Optional[set] = None) -> dict:
+    '''
+    Parses text vdf into nested dictionaries.
+    keys is an optional set of key paths (tuples, ex: ("AppState", "name")),
+    when given, parsing stops as soon as all of them have been read.
+    Values and blocks followed by a [$PLATFORM] conditional that does not
+    match the running system are skipped, see condition_matches.
+    '''
+    if keys:
+        # tokens are matched lazily, the early exit skips the rest of text
+        return _build(_match_tokens(text), keys)
+    # about twice as fast as the tokenizer, most files Steam writes take this path
+    result = _parse_lines(text)
+    if result is not None:
+        return result
+    return _build(_match_tokens(text), None)
+
+def read_children(text: str, block_path: tuple, fields: set) -> dict:
+    '''
+    Returns {child key: {field: value}} for the fields set directly inside every
+    child block of block_path, in a single pass that stops once block_path
+    is closed. block_path and fields must be lowercase, matching is
+    case-insensitive and field names are returned as found in text.
+    [$PLATFORM] conditionals are not evaluated here, Steam does not write
+    them in the files read this way (localconfig.vdf, libraryfolders.vdf).
+    '''
+    result = {}
+    depth = len(block_path)
+    path = []
+    key = None
+    child = None
+    for m in _TOKEN_RE.finditer(text):
+        kind = m.lastindex
+        if kind == TOKEN_STRING or kind == TOKEN_BARE:
+            value = m.group(kind)
+            if key is None:
+                key = value
+                continue
+            if child is not None and len(path) == depth + 1 and key.lower() in fields:
+                if kind == TOKEN_STRING and "\\" in value:
+                    value = unescape(value)
+                child[key] = value
+            key = None
+        elif kind == TOKEN_OPEN:
+            if key is None:
+                raise ValueError(f"Unexpected {{ at offset {m.start(kind)}")
+            path.append(key.lower() if len(path) < depth else key)
+            if len(path) == depth + 1 and tuple(path[:depth]) == block_path:
+                child = result.setdefault(key, {})
+            key = None
+        elif kind == TOKEN_CLOSE:
+            if not path:
+                raise ValueError(f"Unexpected }} at offset {m.start(kind)}")
+            if len(path) == depth and tuple(path) == block_path:
+                break
+            if len(path) == depth + 1:
+                child = None
+            path.pop()
+            key = None
+        elif kind == _TOKEN_ERROR:
+            raise ValueError(f"Unexpected {m.group(kind)!r} at offset {m.start(kind)}")
+        elif kind == _TOKEN_END:
+            break
+    return result
+
+def _render_block(tree: dict, depth: int) -> str:
+    ''' renders keys as text vdf using Steam tab indentation '''
+    indent = "\t" * depth
+    lines = []
+    for key, value in tree.items():
+        if isinstance(value, dict):
+            lines.append(f'{indent}"{escape(key)}"\n{indent}{{\n'
+                         f'{_render_block(value, depth + 1)}{indent}}}\n')
+        else:
+            lines.append(f'{indent}"{escape(key)}"\t\t"{escape(value)}"\n')
+    return "".join(lines)
+
+def patch_values(text: str, values: dict) -> str:
+    '''
+    Returns text with every {key path tuple: value} of values set, only the
+    spans of the affected values are replaced and the rest of the text is
+    kept as-is. Missing keys are inserted inside their deepest existing
+    parent with the nesting they need. Keys are matched case-insensitively.
+    '''
+    targets = {tuple(key.lower() for key in path): path for path in values}
+    pending = set(targets)
+    spans = {}
+    # lowered block path -> offset of its closing brace
+    blocks = {() : len(text)}
+    path = []
+    key = None
+    for kind, value, start, end in tokenize(text):
+        if kind == TOKEN_STRING:
+            if key is None:
+                key = value
+                continue
+            key_path = (*path, key.lower())
+            if key_path in pending:
+                spans[key_path] = (start, end)
+                pending.discard(key_path)
+                if not pending:
+                    break
+            key = None
+        elif kind == TOKEN_OPEN:
+            if key is None:
+                raise ValueError(f"Unexpected {{ at offset {start}")
+            path.append(key.lower())
+            key = None
+        elif kind == TOKEN_CLOSE:
+            if not path:
+                raise ValueError(f"Unexpected }} at offset {start}")
+            blocks.setdefault(tuple(path), start)
+            path.pop()
+            key = None
+    edits = []
+    for key_path, (start, end) in spans.items():
+        edits.append((start, end, f'"{escape(values[targets[key_path]])}"'))
+    # missing keys are grouped by the block they are inserted into
+    inserts = {}
+    for key_path in (key_path for key_path in targets if key_path in pending):
+        anchor = next(key_path[:size] for size in range(len(key_path) - 1, -1, -1)
+                      if key_path[:size] in blocks)
+        original_path = targets[key_path]
+        tree = inserts.setdefault(anchor, {})
+        for missing_key in original_path[len(anchor):-1]:
+            tree = tree.setdefault(missing_key, {})
+        tree[original_path[-1]] = values[original_path]
+    for anchor, tree in inserts.items():
+        position = blocks[anchor]
+        block = _render_block(tree, len(anchor))
+        line_start = text.rfind("\n", 0, position) + 1
+        if text[line_start:position].strip() == "":
+            position = line_start
+            if position == len(text) and text and not text.endswith("\n"):
+                block = "\n" + block
+        else:
+            block = "\n" + block
+        edits.append((position, position, block))
+    edits.sort(key=lambda edit: edit[0])
+    pieces = []
+    last = 0
+    for start, end, replacement in edits:
+        pieces.append(text[last:start])
+        pieces.append(replacement)
+        last = end
+    pieces.append(text[last:])
+    return "".join(pieces)
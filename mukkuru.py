@@ -7,6 +7,7 @@ import json
 from pathlib import Path
 import base64
 import threading
+import multiprocessing
 import sys
 import logging
 import platform
@@ -27,10 +28,17 @@ from utils.core import APP_PORT, SERVER_PORT, APP_DIR
 from utils.core import app_version, get_config, backend_log, set_alive_status
 from utils.core import update_config, format_executable
 from utils import bootstrap
+from utils.jobs import jobs
+from utils.json_store import flush_stores
 
 from library import video
-from library.games import get_games, scan_games, scan_thumbnails, get_username, artwork_worker
+from library.games import get_games, scan_games, scan_thumbnails, get_username
+from library.games import start_artwork_workers
 from library.steam import get_steam_avatar
+from library.playtime import playtime_index
+from library.artwork_index import artwork_index
+from library.artwork_status import artwork_status
+from library.image_variants import image_pipeline
 from library.games import launch_store
 
 from controller.license import license_controller
@@ -38,6 +46,7 @@ from controller.hardware import hardware_controller
 from controller.library import library_controller, external_library
 from controller.dashboard import dashboard_blueprint
 from controller.repos import repos_blueprint
+from controller.jobs import jobs_blueprint
 
 if FRONTEND_MODE == "PYWEBVIEW":
     from view.pywebview import Frontend
@@ -54,6 +63,7 @@ app.register_blueprint(license_controller)
 app.register_blueprint(hardware_controller)
 app.register_blueprint(library_controller)
 app.register_blueprint(repos_blueprint)
+app.register_blueprint(jobs_blueprint)
 app.json.sort_keys = False
 
 wserver = Flask(__name__)
@@ -166,6 +176,7 @@ def reboot_device():
 def exit_mukkuru():
     ''' terminates Mukkuru instance '''
     threading.Event().wait(0.09)
+    flush_stores()
     try:
         if SSERVER is not None:
             SSERVER.close()
@@ -261,6 +272,8 @@ def set_config():
 @app.route('/app/restart')
 def restart_app():
     ''' restarts app '''
+    # execv replaces the process, pending writes would be lost
+    flush_stores()
     if COMPILER_FLAG:
         os.execv(sys.argv[0], sys.argv)
     else:
@@ -286,6 +299,10 @@ def delete_data(selection: str):
         os.mkdir(logo_folder)
         shutil.rmtree(hero_folder)
         os.mkdir(hero_folder)
+        artwork_index.refresh()
+        scan_thumbnails(get_games())
+    elif selection == "artStatus":
+        artwork_status.clear()
     elif selection == "wef":
         terminate_wef()
         shutil.rmtree(os.path.join(mukkuru_env["root"], "wef_bundle"))
@@ -359,7 +376,9 @@ def static_file(path):
                 new_path = sfx_file
         return send_from_directory(serve_path, new_path)
     if path.startswith("thumbnails/") or path.startswith("hero/"):
-        return send_from_directory(mukkuru_env["root"], path, mimetype='image/jpeg')
+        accepts_webp = "image/webp" in request.headers.get("Accept", "")
+        path, mimetype = image_pipeline.resolve(path, accepts_webp)
+        return send_from_directory(mukkuru_env["root"], path, mimetype=mimetype)
     if path.endswith("theme.css"):
         full_path = os.path.join(serve_path, path)
         theme = get_theme(user_config["theme"])
@@ -395,8 +414,10 @@ def static_file(path):
 
 @app.route('/app/progress')
 def check_progress():
-    ''' returns current progress '''
-    global_progress = bootstrap.operation_progress
+    ''' returns current progress, of the newest job reporting it '''
+    global_progress = jobs.progress()
+    if global_progress is None:
+        global_progress = bootstrap.operation_progress
     return jsonify(global_progress)
 
 @app.route('/app/check_updates')
@@ -407,9 +428,12 @@ def check_for_updates():
 
 @app.route('/app/update')
 def start_app_update():
-    ''' downloads update if available '''
-    ret = updater.download_mukkuru_update()
-    return ret
+    ''' starts downloading the update if available, returns its job '''
+    if not COMPILER_FLAG:
+        return jsonify({"error" : "unsupported"}), 501
+    job = jobs.submit("update", updater.download_mukkuru_update, key="update",
+                      context="Mukkuru update")
+    return jsonify(job.to_dict()), 202
 
 @app.route('/config/fullscreen')
 def is_fullscreen():
@@ -467,14 +491,20 @@ def move_files_controller(folder: str):
         "pictures" : user_config["pictureSources"][0]
     }
     if folder not in source_map:
-        return "Invalid option"
+        return jsonify({"error" : "Invalid option"}), 404
     destination_map = get_destination_map()
-    source_folder = source_map[folder]
-    destination_folder = destination_map[folder]
-    loc = localize()
+    job = jobs.submit("move", move_files, source_map[folder], destination_map[folder],
+                      key=f"move_{folder}", context=f"Moving {folder} files")
+    return jsonify(job.to_dict()), 202
+
+def move_files(source_folder: str, destination_folder: str) -> tuple:
+    ''' moves every file of source_folder, returns a message and status code '''
+    loc = expansion.get_localization()
     if len(os.listdir(source_folder)) == 0:
         return loc.get("filesMoveMissing", "There are no files to move"), 404
     for item in os.listdir(source_folder):
+        # files moved before a cancellation stay moved
+        jobs.check_cancelled()
         source_path = os.path.join(source_folder, item)
         destination_path = os.path.join(destination_folder, item)
         shutil.move(source_path, destination_path)
@@ -534,6 +564,10 @@ def main():
     mukkuru_env["library.json"] = os.path.join(mukkuru_env["root"], "library.json")
     mukkuru_env["config.json"] = os.path.join(mukkuru_env["root"], "config.json")
     mukkuru_env["video.json"] = os.path.join(mukkuru_env["root"], "video.json")
+    mukkuru_env["scan_cache.json"] = os.path.join(mukkuru_env["root"], "scan_cache.json")
+    mukkuru_env["sessions.json"] = os.path.join(mukkuru_env["root"], "sessions.json")
+    mukkuru_env["sgdb_ids.json"] = os.path.join(mukkuru_env["root"], "sgdb_ids.json")
+    mukkuru_env["artwork_status.json"] = os.path.join(mukkuru_env["root"], "artwork_status.json")
     mukkuru_env["artwork"] = os.path.join(mukkuru_env["root"], "artwork")
     mukkuru_env["log"] = os.path.join(mukkuru_env["root"], "mukkuru.log")
     mukkuru_env["app_path"] = APP_DIR
@@ -543,6 +577,10 @@ def main():
             print("Running in test mode")
             test.run_tests()
             return
+        elif arg == "--benchmark":
+            print("Running benchmarks")
+            test.run_benchmarks()
+            return
         elif arg == "--add-poolkit-rules":
             expansion.add_poolkit_rule()
             return
@@ -583,6 +621,9 @@ def main():
     for needed_dir in needed_dirs:
         if not os.path.isdir(needed_dir):
             os.makedirs(needed_dir, exist_ok=True)
+    if threading.current_thread() is threading.main_thread():
+        # before the server and job threads start, see ImagePipeline.start
+        image_pipeline.start()
 
     user_config = get_config()
     if not Path(mukkuru_env["library.json"]).is_file():
@@ -590,6 +631,8 @@ def main():
     else:
         games = get_games()
         scan_thumbnails(games)
+        jobs.submit("image_variants", image_pipeline.backfill, artwork_index.downloaded(),
+                    key="image_variants", context="Artwork variants")
     # version correction
     if updater.ver_compare(user_config["configVersion"], "0.3.14") == 0:
         backend_log("updating config...")
@@ -598,14 +641,18 @@ def main():
         del user_config["configVersion"]
         user_config = get_config()
         update_config(user_config)
+    if artwork_status.migrate(user_config):
+        backend_log("moving missing artwork lists to artwork_status.json")
+        update_config(user_config)
     if user_config["startupGameScan"] is True:
         backend_log("[debug] startupGameScan: True, starting library scan")
-        threading.Thread(target=scan_games).start()
+        jobs.submit("library_scan", scan_games, key="library_scan", context="Library scan")
     get_steam_avatar(mukkuru_env["artwork"])
+    playtime_index.refresh_async()
     fix_file_sources()
     if threading.current_thread() is threading.main_thread():
         threading.Thread(target=start_app).start()
-        threading.Thread(target=artwork_worker, daemon=True).start()
+        start_artwork_workers()
         hardware_if.wait_for_server("localhost", APP_PORT)
         Frontend(is_fullscreen(), app_version(), mukkuru_env).start()
         # if main thread returns, ThreadExecutor won't work
@@ -613,4 +660,6 @@ def main():
     else:
         start_app()
 if __name__ == "__main__":
+    # image_variants worker processes start from this executable when frozen
+    multiprocessing.freeze_support()
     main()
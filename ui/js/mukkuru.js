@@ -160,6 +160,12 @@ const isConfigReady = new Promise((resolve) => {
 
 let aliveFails = 0;
 let protonList = [];
+let libraryVersion;
+let libraryEpoch;
+// set when the All Software list has to be requested again before it is shown
+let appListStale = true;
+// largest page /library/query returns
+const LIBRARY_PAGE = 500;
 
 async function fetch_proton_list(){
       const response = await fetch("/library/proton");
@@ -291,6 +297,28 @@ function closeCTX(){
 //Mukkuru::Load:media.js
 // end video_parser.js
 
+function setLibraryVersion(library_response){
+  libraryVersion = library_response.headers.get("X-Library-Version");
+  libraryEpoch = library_response.headers.get("X-Library-Epoch");
+}
+
+// returns entries changed since the last library fetch, null when a full reload is needed
+async function fetchLibraryChanges(){
+  if (libraryVersion == undefined || libraryVersion == null) {
+    return null;
+  }
+  const response = await fetch(`/library/changes?since=${libraryVersion}&epoch=${libraryEpoch}`);
+  if (!response.ok) {
+    return null;
+  }
+  const changes = await response.json();
+  if (changes["reload"]) {
+    return null;
+  }
+  libraryVersion = changes["version"];
+  return {...changes["added"], ...changes["modified"]};
+}
+
 async function reloadGameThumbnails(){
   loadingSpinner = document.getElementById("loadingSpinner");
   backend_log("reloading game thumbnails...");
@@ -298,17 +326,21 @@ async function reloadGameThumbnails(){
     loadingSpinner.classList.add("active");
   }
 
-  const library_response = await fetch("/library/get");
-  if (!library_response.ok) {
-    throw new Error(`HTTP ${network_resp.status}`);
+  game_library = await fetchLibraryChanges();
+  if (game_library == null) {
+    const library_response = await fetch("/library/get");
+    if (!library_response.ok) {
+      throw new Error(`HTTP ${library_response.status}`);
+    }
+    setLibraryVersion(library_response);
+    game_library = await library_response.json();
   }
-  game_library = await library_response.json();
   all_games = document.querySelectorAll('.gameLauncher, .appLauncher');
   all_games.forEach((element) => {
   AppID = element.dataset.gameid;
-  if (game_library[AppID]["Thumbnail"]){
+  if (game_library[AppID] != undefined && game_library[AppID]["Thumbnail"]){
       thumbnail = element.querySelectorAll('.gameLauncher-thumbnail, .appLauncher-thumbnail')[0];
-      thumbnail.src = './thumbnails/'+AppID+'.jpg';
+      thumbnail.src = './thumbnails/tile/'+AppID+'.webp';
     }
   });
   backend_log("reload done");
@@ -633,6 +665,16 @@ function sleep(ms) {
   return new Promise(resolve => setTimeout(resolve, ms));
 }
 
+// polls a background job until it finishes, returns its final status and result
+async function waitJob(job) {
+  while (job.status == "queued" || job.status == "running") {
+    await sleep(500);
+    response = await fetch("/jobs/" + job.id);
+    job = await response.json();
+  }
+  return job;
+}
+
 MEGABYTE = 1000 * 1000;
 
 async function createProgressBar(){
@@ -697,7 +739,11 @@ async function updateMukkuru() {
   close_context_menu(false);
   startProgressBar();
   response = await fetch("/app/update");
-  response_text = await response.text();
+  data = await response.json();
+  if (response.ok) {
+    data = await waitJob(data);
+  }
+  response_text = data.error || data.result;
   if (response_text == "up-to-date") {
     document.getElementById("messageBox").innerText = "Mukkuru is already up-to-date";
     open_context_menu("messageContext");
@@ -709,7 +755,12 @@ async function updateMukkuru() {
 
 async function move_files(transfer_type) {
   response = await fetch("/app/move/"+ transfer_type, {method:"POST"});
-  response_text = await response.text();
+  data = await response.json();
+  if (response.ok) {
+    data = await waitJob(data);
+  }
+  // move jobs return [message, status code]
+  response_text = data.error || (data.result ? data.result[0] : data.status);
   document.getElementById("messageBox").innerText = response_text;
   open_context_menu("messageContext");
 }
@@ -721,6 +772,109 @@ function openStore(){
   }, 100);
 }
 
+// returns [games, total] for /library/query, up to limit games read in pages
+async function queryLibrary(params, limit = Infinity) {
+    const games = [];
+    let total = 0;
+    while (games.length < limit) {
+        const pageLimit = Math.min(limit - games.length, LIBRARY_PAGE);
+        const response = await fetch(`/library/query?${params}&offset=${games.length}&limit=${pageLimit}`);
+        setLibraryVersion(response);
+        const page = await response.json();
+        games.push(...page["games"]);
+        total = page["total"];
+        if (page["games"].length == 0 || games.length >= total) {
+            break;
+        }
+    }
+    return [games, total];
+}
+
+// home screen order and filters, as /library/query parameters
+function homeQuery() {
+    const art = userConfiguration["skipNoArt"] == true ? "true" : "any";
+    return `sort=home&hidden=false&art=${art}`;
+}
+
+function thumbnailSource(AppID, game) {
+    return game["Thumbnail"] ? './thumbnails/tile/'+AppID+'.webp' : "./assets/vector/missing.svg";
+}
+
+function createGameLauncher(AppID, game, favoriteGames, useGlass) {
+    const button = document.createElement('button');
+    button.className = 'gameLauncher';
+    button.id = AppID;
+    button.dataset.gameid = AppID;
+    if (favoriteGames.has(AppID)){
+        button.classList.add("favorite");
+    }
+    button.dataset.proton = game["Proton"] == true;
+
+    const title = document.createElement('div');
+    title.className = 'gameLauncher-title';
+    title.textContent = game["AppName"];
+    title.dataset.text = title.textContent;
+
+    const thumbnail = document.createElement('img');
+    thumbnail.className = 'gameLauncher-thumbnail';
+    thumbnail.src = thumbnailSource(AppID, game);
+    thumbnail.alt = game["AppName"];
+
+    button.appendChild(title);
+    button.appendChild(thumbnail);
+    if (useGlass) {
+        const glass = document.createElement('div');
+        glass.className = 'glass-effect';
+        button.appendChild(glass);
+    }
+    return button;
+}
+
+function createAppLauncher(AppID, game, favoriteGames) {
+    const app = document.createElement('button');
+    app.className = 'appLauncher';
+    if (favoriteGames.has(AppID)){
+        app.classList.add("favorite");
+    }
+    app.dataset.proton = game["Proton"] == true;
+    app.id = "app_" + AppID;
+    app.dataset.gameid = AppID;
+    const appTitle = document.createElement('div');
+    appTitle.className = "appLauncher-title";
+    appTitle.textContent = game["AppName"]
+    appTitle.dataset.text = appTitle.textContent;
+    const appImage = document.createElement('img');
+    appImage.className = 'appLauncher-thumbnail';
+    appImage.src = thumbnailSource(AppID, game);
+    appImage.alt = game["AppName"];
+    app.appendChild(appTitle);
+    app.appendChild(appImage);
+    return app;
+}
+
+// the All Software list is only requested when it is opened
+async function fetch_all_software() {
+    if (!appListStale) {
+        return;
+    }
+    const appList = document.querySelector('.appList');
+    const favoriteGames = new Set(userConfiguration.favorite);
+    const [games] = await queryLibrary(homeQuery());
+    while (appList.firstChild) {
+      appList.removeChild(appList.firstChild);
+    }
+    games.forEach(([AppID, game]) => {
+        appList.appendChild(createAppLauncher(AppID, game, favoriteGames));
+    });
+    appLaunchers = document.querySelectorAll('.appLauncher');
+    appLaunchers.forEach(item => {
+        item.addEventListener('focus', () => {
+            item.scrollIntoView({ behavior: "instant", block: "center" });
+        });
+    });
+    appListStale = false;
+}
+
 async function fetch_games(isConfigReady = undefined) {
     const root = document.documentElement; // This is the <html> element
     const styles = getComputedStyle(root);
@@ -730,10 +884,13 @@ async function fetch_games(isConfigReady = undefined) {
     const useGlass = styles.getPropertyValue('--use-glass').trim() == "1";
     const allSoftwareThumbnailURL = styles.getPropertyValue('--all-software-thumbnail').trim().slice(1, -1);
 
-    response = await fetch("/library/get");
-    data = await response.json();
+    if (isConfigReady != undefined) {
+      await isConfigReady;
+    }
+    gameLimit = userConfiguration["maxGamesInHomeScreen"];
+    // only the games shown on the home screen are requested
+    const [games, total] = await queryLibrary(homeQuery(), gameLimit);
     library_start = performance.now();
-    gameArr = Object.entries(data);
 
     while (gameList.firstChild) {
       gameList.removeChild(gameList.firstChild);
@@ -741,99 +898,15 @@ async function fetch_games(isConfigReady = undefined) {
     while (appList.firstChild) {
       appList.removeChild(appList.firstChild);
     }
+    appListStale = true;
 
     const favoriteGames = new Set(userConfiguration.favorite);
-    const recentPlayed = new Set(userConfiguration.recentPlayed);
-
-    gameArray = [
-        ...gameArr.filter(([key]) => recentPlayed.has(key)),
-        ...gameArr.filter(([key]) => favoriteGames.has(key) && !recentPlayed.has(key)),
-        ...gameArr.filter(([key, val]) => !recentPlayed.has(key) && !favoriteGames.has(key) && val.Thumbnail === true),
-        ...gameArr.filter(([key, val]) => !recentPlayed.has(key) && !favoriteGames.has(key) && val.Thumbnail !== true)
-    ];
-    
-    gamesSkipped = 0;
-    gamesAdded = 0;
-    if (isConfigReady != undefined) {
-      await isConfigReady;
-    }
-
-    gameLimit = userConfiguration["maxGamesInHomeScreen"];
-    gameArray.forEach((item) => {
-        const AppID = item[0];
-        box_src = './thumbnails/'+AppID+'.jpg';
-
-        if (item[1]["Thumbnail"]) {
-
-        } else if (userConfiguration["skipNoArt"] == true){
-            gamesSkipped++;
-            return;
-        } else {
-            box_src = "./assets/vector/missing.svg";
-        }
-
-        if (userConfiguration["blacklist"].includes(AppID)){
-            gamesSkipped++;
-            return;
-        }
-
-        const button = document.createElement('button');
-        button.className = 'gameLauncher';
-        button.id = AppID;
-        button.dataset.gameid = AppID;
-        if (favoriteGames.has(AppID)){
-            button.classList.add("favorite");
-        }
-        let proton = false;
-        if ("Proton" in item[1] && item[1]["Proton"] == true ) {
-            proton = true;
-        }
-        button.dataset.proton = proton;
-
-        const title = document.createElement('div');
-        title.className = 'gameLauncher-title';
-        title.textContent = item[1]["AppName"];
-        title.dataset.text = title.textContent;
-
-        const thumbnail = document.createElement('img');
-        thumbnail.className = 'gameLauncher-thumbnail';
-        thumbnail.src = box_src;
-        thumbnail.alt = item[1]["AppName"];
-
-        button.appendChild(title);
-        button.appendChild(thumbnail);
-        if (useGlass) {
-            const glass = document.createElement('div');
-            glass.className = 'glass-effect';
-            button.appendChild(glass);
-        }
-
-        if (gameLimit > gamesAdded){
-            gameList.appendChild(button);
-            gamesAdded++;
-        }
-        const app = document.createElement('button');
-        app.className = 'appLauncher';
-        if (favoriteGames.has(AppID)){
-            app.classList.add("favorite");
-        }
-        app.dataset.proton = proton;
-        app.id = "app_" + AppID;
-        app.dataset.gameid = AppID;
-        const appTitle = document.createElement('div');
-        appTitle.className = "appLauncher-title";
-        appTitle.textContent = item[1]["AppName"]
-        appTitle.dataset.text = appTitle.textContent;
-        const appImage = document.createElement('img');
-        appImage.className = 'appLauncher-thumbnail';
-        appImage.src = box_src;
-        appImage.alt = item[1]["AppName"];
-        app.appendChild(appTitle);
-        app.appendChild(appImage);
-        appList.appendChild(app);
+    games.forEach(([AppID, game]) => {
+        gameList.appendChild(createGameLauncher(AppID, game, favoriteGames, useGlass));
     });
+    gamesAdded = games.length;
 
-    if (gamesAdded >= gameLimit) {
+    if (total >= gameLimit) {
         backend_log("Game limit exceeded, creating all-software button");
         const moreButton = document.createElement('button');
         moreButton.className = 'gameLauncher-more';
@@ -880,12 +953,6 @@ async function fetch_games(isConfigReady = undefined) {
     spacer.style.minWidth = "300px";
     gameList.appendChild(spacer);
 
-    appLaunchers.forEach(item => {
-        item.addEventListener('focus', () => {
-            item.scrollIntoView({ behavior: "instant", block: "center" });
-        });
-    });
-
     if (displayHero) {
         bg = document.getElementById("bg");
         bg.style.backgroundRepeat = "no-repeat";
@@ -899,7 +966,7 @@ async function fetch_games(isConfigReady = undefined) {
             item.scrollIntoView({ behavior: "instant", block: "center", inline: "center" });
             if (displayHero) {//start displayHero
                 if (!item.classList.contains("gameLauncher-more")) {
-                    bg.style.backgroundImage = "url('hero/" + item.id+ ".png')";
+                    bg.style.backgroundImage = "url('hero/screen/" + item.id+ ".webp')";
                 } else{
                     bg.style.backgroundImage = "none";
                 }
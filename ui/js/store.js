@@ -84,7 +84,7 @@ async function fetchPatches(){
         }
         value.forEach((patch, index) => {
             const PatchIndex = index;
-            box_img = './thumbnails/'+AppID+'.jpg';
+            box_img = './thumbnails/tile/'+AppID+'.webp';
             const thumbnail = document.createElement('img')
             thumbnail.src = box_img;
             thumbnail.alt = patch["name"];
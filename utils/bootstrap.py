@@ -12,6 +12,8 @@ from pathlib import Path
 
 import requests
 from utils.core import mukkuru_env, format_executable, sanitized_env
+from utils.jobs import jobs, JobCancelled
+from utils.http_session import get_session
 
 if platform.system() == "Windows":
     import ctypes
@@ -27,7 +29,13 @@ operation_progress = {
 }
 
 def global_progress_callback(downloaded: int, total: int) -> None:
-    ''' handles progress in a global context '''
+    ''' handles progress in a global context, or of the running job '''
+    job = jobs.current()
+    if job is not None:
+        job.set_progress(downloaded, total)
+        # stops downloads of cancelled jobs
+        job.check_cancelled()
+        return
     operation_progress["downloaded"] = downloaded
     operation_progress["total"] = total
     if total == 0:
@@ -36,12 +44,20 @@ def global_progress_callback(downloaded: int, total: int) -> None:
     operation_progress["active"] = True
 
 def set_global_progress_context(title: str) -> None:
-    ''' sets parameter as global_progress title '''
+    ''' sets parameter as global_progress title, or as the running job title '''
+    job = jobs.current()
+    if job is not None:
+        job.set_context(title)
+        return
     operation_progress["context"] = title
     operation_progress["active"] = True
 
 def clear_global_progress() -> None:
-    ''' clears operation_progress '''
+    ''' clears operation_progress, or the progress of the running job '''
+    job = jobs.current()
+    if job is not None:
+        job.clear_progress()
+        return
     operation_progress["downloaded"] = 0
     operation_progress["total"] = 0
     operation_progress["progress"] = 0
@@ -49,19 +65,26 @@ def clear_global_progress() -> None:
     operation_progress["context"] = "unknown"
 
 def download_file(url, path: str, progress_callback=None, chunk_size=8192):
-    '''Download file from URL with optional progress callback'''
-    with requests.get(url, stream=True, timeout=20) as response:
+    '''
+    Download file from URL with optional progress callback, the partial
+    file is removed when the callback cancels the download
+    '''
+    with get_session().get(url, stream=True, timeout=20) as response:
         response.raise_for_status()
         total = int(response.headers.get('content-length', 0))
         downloaded = 0
 
-        with open(path, 'wb') as out_file:
-            for chunk in response.iter_content(chunk_size=chunk_size):
-                if chunk:
-                    out_file.write(chunk)
-                    downloaded += len(chunk)
-                    if progress_callback:
-                        progress_callback(downloaded, total)
+        try:
+            with open(path, 'wb') as out_file:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        out_file.write(chunk)
+                        downloaded += len(chunk)
+                        if progress_callback:
+                            progress_callback(downloaded, total)
+        except JobCancelled:
+            os.remove(path)
+            raise
 
 def get_unrar():
     ''' gets unrar path '''
@@ -15,6 +15,7 @@ import platform
 import inspect
 import unicodedata
 import re
+import tempfile
 
 # Constants
 mukkuru_env = {}
@@ -61,6 +62,8 @@ def get_config() -> dict:
             "loop" : False,
             "skipNoArt" : False,
             "skipDuplicated" : True,
+            "storePreference" : ["steam", "non-steam", "crossover_steam",
+                                 "crossover_non-steam", "egs", "heroic"],
             "displayBatteryPercent" : False,
             "maxGamesInHomeScreen" : 12,
             "enableServer" : False,
@@ -85,12 +88,10 @@ def get_config() -> dict:
             "showKeyGuide" : True,
             "theme" : "JoyView 2",
             "cores" : 6,
+            "artworkWorkers" : 4,
             "alwaysShowBottomBar" : True,
             "uiSounds" : "original",
             "gameProperties" : {},
-            "boxartBlacklist" : [],
-            "logoBlacklist" : [],
-            "heroBlacklist" : [],
             "losslessScaling" : [],
             "configVersion" : APP_VERSION,
             "adultContent" : False,
@@ -124,6 +125,28 @@ def update_config(user_config: dict) -> None:
     with open(mukkuru_env['config.json'] , 'w', encoding='utf-8') as f:
         json.dump(user_config, f)
 
+def atomic_write(path: str, data) -> None:
+    ''' writes data into a temp file next to path, then replaces path with it '''
+    binary = isinstance(data, (bytes, bytearray, memoryview))
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.",
+                                    suffix=".tmp", dir=directory)
+    try:
+        if binary:
+            f = os.fdopen(fd, 'wb')
+        else:
+            f = os.fdopen(fd, 'w', encoding='utf-8', newline='')
+        with f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if Path(path).is_file():
+            os.chmod(tmp_path, os.stat(path).st_mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
 def set_alive_status(value) -> None:
     ''' set alive status, this will be periodically read from frontend '''
     mukkuru_env["alive"] = value
@@ -14,8 +14,7 @@ import requests
 from utils.core import mukkuru_env, get_config, update_config, backend_log
 from utils.core import APP_DIR, sanitized_env, ternary
 from utils import bootstrap, hardware_if
-from library import steam
-from library.games import get_games
+from library.games import get_games, apply_launch_options
 
 def get_localization() -> dict:
     ''' Returns a localization dictionary '''
@@ -384,12 +383,17 @@ def is_lossless_scaling_available():
 
 def toggle_lossless_scaling_for_game(appid: str, state: bool = True):
     ''' Enables lossless scaling for steam game, returns message '''
+    toggle_lossless_scaling_for_games([appid], state)
+
+def toggle_lossless_scaling_for_games(appids: list, state: bool = True) -> dict:
+    ''' Enables lossless scaling for several steam games, Steam is restarted once '''
     if platform.system() == "Windows":
         # ignore
-        return
+        return {}
     games = get_games()
-    if appid not in games:
-        return
+    appids = [appid for appid in appids if appid in games]
+    if not appids:
+        return {}
     process_name = "steam"
     #if platform.system() == "Windows":
     #    process_name = "steam.exe"
@@ -405,18 +409,12 @@ def toggle_lossless_scaling_for_game(appid: str, state: bool = True):
             backend_log("nothing was closed")
         else:
             procs[0].terminate()
-    source = games[appid]["Source"]
-    steam_env = steam.get_steam_env()
     command = ternary(state, "~/lsfg %command%", "%command%")
-    if source == "steam":
-        steam.set_launch_options(steam_env, appid, command)
-    elif source == "non-steam":
-        steam.set_shortcut_launch_options(steam_env, appid, command)
-    else:
-        backend_log("Unsupported source, only steam games and shortcuts supported")
+    results = apply_launch_options({appid: command for appid in appids})
     if gamescope_flag:
         procs = hardware_if.get_process_by_name(process_name)
         if len(procs) > 0:
             from view.alternate_ui import Frontend#pylint: disable=C0415
             Frontend().close()
             procs[0].kill()
+    return results
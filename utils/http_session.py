@@ -0,0 +1,46 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Shared HTTP session, keeps connections alive and retries transient failures '''
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# hosts with a connection pool kept, SteamGridDB api and image cdn among others
+POOL_HOSTS = 8
+# connections kept per host, enough for the artwork workers and scans
+POOL_SIZE = 16
+RETRIES = 4
+# waits 0.5s, 1s, 2s... between retries, unless the server sends Retry-After
+BACKOFF_FACTOR = 0.5
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+def create_session(pool_size: int = POOL_SIZE, retries: int = RETRIES) -> requests.Session:
+    ''' returns a session with pooled connections and retries on 429 and 5xx '''
+    retry = Retry(
+        total=retries,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        # the last response is returned, callers already handle error statuses
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=pool_size,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session() -> requests.Session:
+    ''' returns the process wide session '''
+    global _session #pylint: disable=W0603
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
@@ -0,0 +1,212 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Background jobs with progress, cancellation and coalescing of duplicate requests '''
+import time
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from utils.core import backend_log
+
+# jobs running at the same time, others wait in the queue
+JOB_WORKERS = 4
+# finished jobs kept for /jobs
+FINISHED_JOBS = 50
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+class JobCancelled(Exception):
+    ''' raised inside a job once it has been cancelled '''
+
+class Job:
+    ''' A single background operation and its progress '''
+    def __init__(self, job_id: int, kind: str, key: Optional[str], context: str):
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        self.status = QUEUED
+        self.context = context
+        self.downloaded = 0
+        self.total = 0
+        self.progress = 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        # set once the job reports progress, only those are shown by /app/progress
+        self.reporting = False
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        ''' whether the job is queued or running '''
+        return self.status in (QUEUED, RUNNING)
+
+    def set_context(self, context: str) -> None:
+        ''' sets the job title shown to the user '''
+        self.context = context
+        self.reporting = True
+
+    def set_progress(self, downloaded: int, total: int, report: bool = True) -> None:
+        '''
+        sets job progress, report=False keeps it out of /app/progress,
+        which only shows one operation at a time
+        '''
+        self.downloaded = downloaded
+        self.total = total
+        self.progress = (downloaded / total) * 100 if total else 0
+        if report:
+            self.reporting = True
+
+    def clear_progress(self) -> None:
+        ''' stops reporting progress, the job keeps running '''
+        self.downloaded = 0
+        self.total = 0
+        self.progress = 0
+        self.reporting = False
+
+    def check_cancelled(self) -> None:
+        ''' raises JobCancelled if the job was cancelled '''
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"job {self.id} was cancelled")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        ''' waits for the job to finish, returns False on timeout '''
+        return self.done_event.wait(timeout)
+
+    def to_dict(self) -> dict:
+        ''' job status without its result '''
+        return {
+            "id" : self.id,
+            "kind" : self.kind,
+            "status" : self.status,
+            "context" : self.context,
+            "downloaded" : self.downloaded,
+            "total" : self.total,
+            "progress" : self.progress,
+            "error" : self.error,
+            "created" : self.created,
+            "started" : self.started,
+            "finished" : self.finished,
+        }
+
+class JobManager:
+    '''
+    Runs jobs on a bounded thread pool. Jobs submitted with the key of an
+    active job are coalesced, the active job is returned instead.
+    '''
+    def __init__(self, max_workers: int = JOB_WORKERS):
+        self.max_workers = max_workers
+        self.executor = None
+        self.jobs = {}
+        self.keys = {}
+        self.ids = itertools.count(1)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def submit(self, kind: str, target, *args, key: Optional[str] = None,
+               context: str = "") -> Job:
+        ''' queues target(*args) as a job, or returns the active job with the same key '''
+        with self.lock:
+            if key is not None:
+                job = self.keys.get(key)
+                if job is not None and job.active:
+                    return job
+            job = Job(next(self.ids), kind, key, context)
+            self.jobs[job.id] = job
+            if key is not None:
+                self.keys[key] = job
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                   thread_name_prefix="job")
+            self._prune()
+        self.executor.submit(self._run, job, target, args)
+        return job
+
+    def _prune(self) -> None:
+        finished = [job for job in self.jobs.values() if not job.active]
+        for job in finished[:-FINISHED_JOBS]:
+            del self.jobs[job.id]
+            if self.keys.get(job.key) is job:
+                del self.keys[job.key]
+
+    def _run(self, job: Job, target, args: tuple) -> None:
+        if job.cancel_event.is_set():
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+        job.started = time.time()
+        self.local.job = job
+        try:
+            job.result = target(*args)
+            status = DONE
+        except JobCancelled:
+            status = CANCELLED
+        except Exception as e:#pylint: disable=W0718
+            # a failed job must not take the worker down with it
+            backend_log(f"job {job.kind} failed: {e}")
+            job.error = str(e)
+            status = FAILED
+        finally:
+            self.local.job = None
+        self._finish(job, status)
+
+    def _finish(self, job: Job, status: str) -> None:
+        job.status = status
+        job.finished = time.time()
+        job.done_event.set()
+
+    def current(self) -> Optional[Job]:
+        ''' returns the job running in this thread, if any '''
+        return getattr(self.local, "job", None)
+
+    def check_cancelled(self) -> None:
+        ''' raises JobCancelled if the job running in this thread was cancelled '''
+        job = self.current()
+        if job is not None:
+            job.check_cancelled()
+
+    def get(self, job_id: int) -> Optional[Job]:
+        ''' returns a job by id '''
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> list:
+        ''' returns the status of every known job, newest first '''
+        with self.lock:
+            snapshot = list(self.jobs.values())
+        return [job.to_dict() for job in reversed(snapshot)]
+
+    def cancel(self, job_id: int) -> bool:
+        '''
+        requests cancellation, queued jobs never start and running
+        jobs stop the next time they check or report progress
+        '''
+        job = self.get(job_id)
+        if job is None or not job.active:
+            return False
+        job.cancel_event.set()
+        return True
+
+    def progress(self) -> Optional[dict]:
+        ''' progress of the newest running job that reports it, in the /app/progress format '''
+        with self.lock:
+            snapshot = list(self.jobs.values())
+        for job in reversed(snapshot):
+            if job.status == RUNNING and job.reporting:
+                return {
+                    "active" : True,
+                    "downloaded" : job.downloaded,
+                    "progress" : job.progress,
+                    "total" : job.total,
+                    "context" : job.context,
+                }
+        return None
+
+jobs = JobManager()
@@ -0,0 +1,113 @@
+# Copyright (c) 2025 b1on1cdog
+# Licensed under the MIT License
+''' Json files kept in memory and written in the background, flushed together on exit '''
+import atexit
+import json
+import threading
+import weakref
+from typing import Any, Optional
+from utils.core import mukkuru_env, backend_log, atomic_write
+
+# seconds to wait for more changes before writing a file
+SAVE_DELAY = 2.0
+
+_stores = weakref.WeakSet()
+_stores_lock = threading.Lock()
+
+def flush_stores() -> None:
+    ''' writes pending changes of every store, call before the process exits or restarts '''
+    with _stores_lock:
+        stores = list(_stores)
+    for store in stores:
+        store.save()
+
+# os._exit and os.execv skip this, those paths call flush_stores themselves
+atexit.register(flush_stores)
+
+class JsonStore:
+    '''
+    Base of the json files Mukkuru keeps in memory. Subclasses hold their
+    state under self.lock, call _changed() after modifying it and implement
+    _dump(), which returns what save() writes. A burst of changes is written
+    once, delay seconds after the first one.
+    When file_version is set files are {"version": file_version, field: data},
+    files of another version are discarded. Bump it whenever data changes shape.
+    '''
+    file_version = None
+    field = "entries"
+    # mukkuru_env key of the default file, and how logs name it
+    env_key = None
+    name = "json store"
+
+    def __init__(self, path: Optional[str] = None, delay: float = SAVE_DELAY):
+        self.path = path
+        self.delay = delay
+        self.timer = None
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        with _stores_lock:
+            _stores.add(self)
+
+    def _store_path(self) -> Optional[str]:
+        if self.path is None:
+            return mukkuru_env.get(self.env_key)
+        return self.path
+
+    def _read(self) -> Any:
+        ''' returns the stored data, None when the file is missing, outdated or invalid '''
+        store_path = self._store_path()
+        if store_path is None:
+            return None
+        try:
+            with open(store_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (PermissionError, json.decoder.JSONDecodeError) as e:
+            backend_log(f"{self.name} not loaded: {e}")
+            return None
+        if self.file_version is None:
+            return data
+        if not isinstance(data, dict) or data.get("version") != self.file_version:
+            return None
+        return data.get(self.field)
+
+    def _changed(self) -> None:
+        ''' marks the store dirty and schedules a save, self.lock must be held '''
+        self.dirty = True
+        if self.timer is None:
+            self.timer = threading.Timer(self.delay, self.save)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def _dump(self) -> Any:
+        ''' returns data to save, called with self.lock held and serialized after releasing it '''
+        raise NotImplementedError
+
+    def _saved(self, data: Any) -> None:
+        ''' called after data was written '''
+
+    def save(self) -> None:
+        ''' writes pending changes now '''
+        store_path = self._store_path()
+        with self.save_lock:
+            with self.lock:
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+                if not self.dirty or store_path is None:
+                    return
+                data = self._dump()
+                self.dirty = False
+            content = data
+            if self.file_version is not None:
+                content = {"version" : self.file_version, self.field : data}
+            try:
+                atomic_write(store_path, json.dumps(content))
+            except OSError as e:
+                backend_log(f"unable to save {self.name}: {e}")
+                with self.lock:
+                    self.dirty = True
+                return
+            self._saved(data)
@@ -2,10 +2,31 @@
 # Licensed under the MIT License
 ''' This Mukkuru module will handle unit testing '''
 #import json
-from utils import updater
+import io
+import os
+import json
+import random
+import struct
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from utils import updater, bootstrap, http_session
+from utils.jobs import JobManager, DONE, CANCELLED
 from utils.bootstrap import get_7z, get_unrar, get_ffmpeg
 from library.games import library_scan
-from library import steam
+from library import steam, text_vdf_parser, playtime, grid_db
+from library.search_index import SearchIndex
+from library.sgdb_id_cache import SgdbIdCache
+from library.scan_cache import ScanCache
+from library.image_variants import ImagePipeline, variant_path
+from library.artwork_index import asset_path
+from utils.core import mukkuru_env
+from library.binary_vdf_parser import BinaryVDFParser
+from library.binary_vdf_parser import Pointer, Color, UInt64, Int64, WideString, TYPE_END_ALT
 
 def test_compare(ver1, ver2):
     '''test ver_compare'''
@@ -28,8 +49,538 @@ def test_tools():
     print(f"unrar path : {unrar}")
     print(f"ffmpeg path : {ffmpeg}")
 
+def legacy_parse_text_vdf(vdf_text) -> dict:
+    ''' line based parser replaced by text_vdf_parser, kept as benchmark baseline '''
+    lines = vdf_text.split('\n')
+    stack = []
+    current = {}
+    result = current
+    key = None
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('//'):
+            continue
+        if line == '{':
+            new_dict = {}
+            stack.append((current, key))
+            current[key] = new_dict
+            current = new_dict
+        elif line == '}':
+            if stack:
+                current, key = stack.pop()
+        else:
+            parts = line.split('"')
+            if len(parts) >= 3:
+                key = parts[1]
+                value = parts[3] if len(parts) >= 4 else ""
+                current[key] = value
+    return result
+
+def generate_libraryfolders(libraries: int, apps: int) -> str:
+    ''' generates a libraryfolders.vdf with the given size '''
+    lines = ['"libraryfolders"', '{']
+    for library in range(libraries):
+        lines.extend([f'\t"{library}"', '\t{',
+                      f'\t\t"path"\t\t"/media/library{library}/SteamLibrary"',
+                      '\t\t"label"\t\t""', f'\t\t"contentid"\t\t"{library}4520"',
+                      '\t\t"totalsize"\t\t"0"', '\t\t"apps"', '\t\t{'])
+        for app in range(apps):
+            lines.append(f'\t\t\t"{library * apps + app}"\t\t"{app * 1024}"')
+        lines.extend(['\t\t}', '\t}'])
+    lines.append('}')
+    return "\n".join(lines)
+
+def generate_localconfig(apps: int) -> str:
+    ''' generates a localconfig.vdf with the given amount of apps '''
+    lines = ['"UserLocalConfigStore"', '{', '\t"Software"', '\t{', '\t\t"Valve"', '\t\t{',
+             '\t\t\t"Steam"', '\t\t\t{', '\t\t\t\t"apps"', '\t\t\t\t{']
+    for app in range(apps):
+        lines.extend([f'\t\t\t\t\t"{app}"', '\t\t\t\t\t{',
+                      f'\t\t\t\t\t\t"LastPlayed"\t\t"{1700000000 + app}"',
+                      f'\t\t\t\t\t\t"Playtime"\t\t"{app % 600}"',
+                      '\t\t\t\t\t\t"cloud"', '\t\t\t\t\t\t{',
+                      '\t\t\t\t\t\t\t"last_sync_state"\t\t"synchronized"',
+                      '\t\t\t\t\t\t}',
+                      '\t\t\t\t\t\t"LaunchOptions"\t\t"PROTON_LOG=1 %command%"',
+                      '\t\t\t\t\t}'])
+    lines.extend(['\t\t\t\t}', '\t\t\t}', '\t\t}', '\t}', '}'])
+    return "\n".join(lines)
+
+def benchmark(label: str, function, *args, rounds: int = 5) -> float:
+    ''' prints and returns best wall time of function(*args) in seconds '''
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    print(f"{label}: {best * 1000:.2f} ms")
+    return best
+
+def test_jobs():
+    ''' checks job coalescing, cancellation and progress reporting '''
+    manager = JobManager(max_workers=2)
+    calls = []
+    def scan(value):
+        calls.append(value)
+        time.sleep(0.2)
+        return value
+    job = manager.submit("scan", scan, 1, key="scan")
+    assert manager.submit("scan", scan, 2, key="scan") is job, "duplicate job was not coalesced"
+    job.wait()
+    assert job.status == DONE and job.result == 1 and calls == [1], "coalesced job ran twice"
+    def download():
+        current = manager.current()
+        for downloaded in range(100):
+            current.set_progress(downloaded, 100)
+            current.check_cancelled()
+            time.sleep(0.01)
+    job = manager.submit("download", download, context="download")
+    time.sleep(0.1)
+    assert manager.progress()["total"] == 100, "progress was not reported"
+    assert manager.cancel(job.id), "running job was not cancellable"
+    assert job.wait(1) and job.status == CANCELLED, "job ignored cancellation"
+    assert manager.progress() is None, "finished job still reports progress"
+    print("jobs: OK")
+
+def test_text_vdf_conditionals():
+    ''' checks [$PLATFORM] conditionals are evaluated against the running system '''
+    flags = text_vdf_parser.platform_flags()
+    windows = "WIN32" in flags
+    data = text_vdf_parser.loads('"k" "v" [$WIN32] "k" "w" [$LINUX] "k" "x" [$OSX]')
+    expected = "v" if windows else "w" if "LINUX" in flags else "x"
+    assert data == {"k" : expected}, f"conditional values resolved to {data}"
+    data = text_vdf_parser.loads('"a" [!$WIN32] { "b" "c" } "d" "e" [$WIN32||$POSIX]')
+    assert data == ({"d" : "e"} if windows else {"a" : {"b" : "c"}, "d" : "e"}), \
+        f"conditional block resolved to {data}"
+    data = text_vdf_parser.loads('"a" { "k" "v" "k" "w" [$X360] } "z" "1"', {("a", "k")})
+    assert data == {"a" : {"k" : "v"}}, "early exit kept a value of another platform"
+    print("text vdf conditionals: OK")
+
+def benchmark_text_vdf():
+    ''' compares text_vdf_parser with the legacy line parser '''
+    libraryfolders = generate_libraryfolders(8, 2500)
+    localconfig = generate_localconfig(10000)
+    print(f"libraryfolders.vdf: {len(libraryfolders)} bytes, "
+          f"localconfig.vdf: {len(localconfig)} bytes")
+    benchmark("legacy libraryfolders.vdf", legacy_parse_text_vdf, libraryfolders)
+    benchmark("tokenizer libraryfolders.vdf", text_vdf_parser.loads, libraryfolders)
+    benchmark("legacy localconfig.vdf", legacy_parse_text_vdf, localconfig)
+    benchmark("tokenizer localconfig.vdf", text_vdf_parser.loads, localconfig)
+    acf = generate_localconfig(200).replace('"UserLocalConfigStore"',
+        '"AppState"\n{\n"appid" "1"\n"name" "Game"\n"installdir" "Game"\n}\n"Other"', 1)
+    benchmark("tokenizer acf (full)", text_vdf_parser.loads, acf)
+    benchmark("tokenizer acf (early exit)", text_vdf_parser.loads, acf, steam.ACF_KEYS)
+
+class LegacyBinaryVDFParser:
+    ''' byte by byte shortcuts.vdf reader, kept as benchmark baseline '''
+    def __init__(self, data: bytes):
+        self.file = io.BytesIO(data)
+
+    def read_string(self):
+        ''' reads a null terminated string one byte at a time '''
+        chars = []
+        while True:
+            byte = self.file.read(1)
+            if byte == b'\x00' or byte == b'':
+                break
+            chars.append(byte)
+        return b''.join(chars).decode("utf-8", errors="replace")
+
+    def read_dict(self):
+        ''' reads entries until end marker '''
+        result = {}
+        while True:
+            entry_type = self.file.read(1)
+            if not entry_type or entry_type == b'\x08':
+                return result
+            name = self.read_string()
+            if entry_type == b'\x00':
+                result[name] = self.read_dict()
+            elif entry_type == b'\x01':
+                result[name] = self.read_string()
+            elif entry_type == b'\x02':
+                result[name] = struct.unpack("<I", self.file.read(4))[0]
+            elif entry_type == b'\x07':
+                result[name] = struct.unpack("<Q", self.file.read(8))[0]
+            else:
+                raise ValueError(f"Unknown type: {entry_type}")
+
+def generate_shortcuts(count: int) -> dict:
+    ''' generates shortcuts.vdf data with the given amount of shortcuts '''
+    shortcuts = {}
+    for index in range(count):
+        shortcuts[str(index)] = {
+            "appid" : 3000000000 + index,
+            "AppName" : f"Generated Game {index}",
+            "Exe" : f'"/home/deck/Games/game{index}/game.exe"',
+            "StartDir" : f'"/home/deck/Games/game{index}/"',
+            "icon" : f"/home/deck/Games/game{index}/icon.png",
+            "ShortcutPath" : "",
+            "LaunchOptions" : "PROTON_LOG=1 %command%",
+            "IsHidden" : 0,
+            "AllowDesktopConfig" : 1,
+            "AllowOverlay" : 1,
+            "OpenVR" : 0,
+            "Devkit" : 0,
+            "DevkitGameID" : "",
+            "DevkitOverrideAppID" : 0,
+            "LastPlayTime" : 1700000000 + index,
+            "FlatpakAppID" : "",
+            "tags" : {"0" : "Favorite", "1" : f"Collection {index % 7}"}
+        }
+    return {"shortcuts" : shortcuts}
+
+def write_shortcuts(folder: str, count: int) -> str:
+    ''' writes a generated shortcuts.vdf into folder, returns its path '''
+    path = os.path.join(folder, "shortcuts.vdf")
+    BinaryVDFParser(None).save_shortcut(path, generate_shortcuts(count))
+    return path
+
+def benchmark_binary_vdf():
+    ''' compares buffer based BinaryVDFParser with the byte by byte reader '''
+    with tempfile.TemporaryDirectory(prefix="mukkuru-") as folder:
+        path = write_shortcuts(folder, 5000)
+        with open(path, "rb") as f:
+            data = f.read()
+        print(f"shortcuts.vdf: {len(data)} bytes, 5000 shortcuts")
+        legacy = LegacyBinaryVDFParser(data).read_dict()
+        assert legacy == BinaryVDFParser(None).parse_shortcut(path), "parser output differs"
+        benchmark("legacy shortcuts.vdf", lambda: LegacyBinaryVDFParser(data).read_dict())
+        benchmark("buffer shortcuts.vdf", BinaryVDFParser(None).parse_shortcut, path)
+
+def peak_memory(function, *args) -> int:
+    ''' returns peak python memory allocated by function(*args) in bytes '''
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def benchmark_shortcut_iterator():
+    ''' compares full shortcuts.vdf parsing with the selective iterator '''
+    fields = set(steam.SHORTCUT_FIELDS)
+    def full_scan(path):
+        shortcuts = BinaryVDFParser(None).parse_shortcut(path)["shortcuts"]
+        return [[index, {field : value[field] for field in fields if field in value}]
+                for index, value in shortcuts.items()]
+    def iterator_scan(path):
+        for _ in BinaryVDFParser(None).iter_shortcuts(path, fields):
+            pass
+    for count in (1000, 10000):
+        with tempfile.TemporaryDirectory(prefix="mukkuru-") as folder:
+            path = write_shortcuts(folder, count)
+            assert full_scan(path) == steam.read_shortcuts(path), "iterator output differs"
+            benchmark(f"full parse {count} shortcuts", full_scan, path)
+            benchmark(f"iterator {count} shortcuts", iterator_scan, path)
+            print(f"peak memory full parse: {peak_memory(full_scan, path) // 1024} KiB, "
+                  f"iterator: {peak_memory(iterator_scan, path) // 1024} KiB")
+
+def generate_typed_shortcuts(count: int) -> dict:
+    ''' generated shortcuts that also use every other binary vdf type '''
+    data = generate_shortcuts(count)
+    for index, shortcut in data["shortcuts"].items():
+        shortcut["Scale"] = float(int(index) % 8) / 4
+        shortcut["Pointer"] = Pointer(int(index))
+        shortcut["Color"] = Color(0xFF00FF00)
+        shortcut["SmallUInt64"] = UInt64(int(index))
+        shortcut["Int64"] = Int64(-int(index) - 1)
+        shortcut["WideName"] = WideString(f"Juego ñandú {index} \U0001F3AE")
+    return data
+
+def test_binary_vdf_roundtrip():
+    ''' checks binary vdf writer output can be read back byte identical '''
+    parser = BinaryVDFParser(None)
+    for count in (0, 1, 250):
+        data = generate_typed_shortcuts(count)
+        serialized = parser.dump_bytes(data)
+        parsed = parser.parse_bytes(serialized)
+        assert parsed == data, f"parsed data differs ({count} shortcuts)"
+        assert parser.dump_bytes(parsed) == serialized, f"round trip differs ({count} shortcuts)"
+        for index, shortcut in parsed["shortcuts"].items():
+            for key, value in data["shortcuts"][index].items():
+                assert type(shortcut[key]) is type(value), f"{key} type changed"
+        with tempfile.TemporaryDirectory(prefix="mukkuru-") as folder:
+            path = write_shortcuts(folder, 0)
+            parser.save_shortcut(path, parsed)
+            with open(path, "rb") as f:
+                assert f.read() == serialized, "saved file differs"
+            assert os.listdir(folder) == ["shortcuts.vdf"], "temp file left behind"
+            iterated = dict(parser.iter_shortcuts(path))
+            assert iterated == data["shortcuts"], "iterator output differs"
+    # some files end their maps with 0x0B, it is written back unchanged
+    writer = BinaryVDFParser(None)
+    writer.end_marker = TYPE_END_ALT
+    serialized = writer.dump_bytes(generate_typed_shortcuts(3))
+    assert serialized.endswith(b"\x0b\x0b\x0b"), "alternate end marker was not written"
+    parsed = parser.parse_bytes(serialized)
+    assert parser.dump_bytes(parsed) == serialized, "0x0B end markers were not kept"
+    print("binary vdf round trip: OK")
+
+def benchmark_binary_vdf_writer():
+    ''' measures binary vdf serialization and atomic save throughput '''
+    parser = BinaryVDFParser(None)
+    data = generate_typed_shortcuts(10000)
+    size = len(parser.dump_bytes(data))
+    elapsed = benchmark("serialize 10000 shortcuts", parser.dump_bytes, data)
+    print(f"serialize throughput: {size / elapsed / 1048576:.1f} MiB/s")
+    with tempfile.TemporaryDirectory(prefix="mukkuru-") as folder:
+        path = write_shortcuts(folder, 0)
+        elapsed = benchmark("atomic save 10000 shortcuts", parser.save_shortcut, path, data)
+        print(f"save throughput: {size / elapsed / 1048576:.1f} MiB/s")
+        elapsed = benchmark("parse 10000 shortcuts", parser.parse_shortcut, path)
+        print(f"parse throughput: {size / elapsed / 1048576:.1f} MiB/s")
+
+def benchmark_localconfig_patch():
+    ''' compares single key splicing with a full vdf load and dump '''
+    import vdf#pylint: disable=C0415
+    localconfig = generate_localconfig(10000)
+    apps_path = ("UserLocalConfigStore", "Software", "Valve", "Steam", "apps")
+    def load_dump():
+        data = vdf.loads(localconfig)
+        data["UserLocalConfigStore"]["Software"]["Valve"]["Steam"]["apps"]["5000"][
+            "LaunchOptions"] = "~/lsfg %command%"
+        return vdf.dumps(data, pretty=True)
+    def splice():
+        values = {(*apps_path, "5000", "LaunchOptions") : "~/lsfg %command%"}
+        return text_vdf_parser.patch_values(localconfig, values)
+    assert vdf.loads(load_dump()) == vdf.loads(splice()), "patched content differs"
+    print(f"localconfig.vdf: {len(localconfig)} bytes")
+    benchmark("vdf load/dump LaunchOptions", load_dump)
+    benchmark("splice LaunchOptions", splice)
+
+def benchmark_playtime():
+    ''' compares the single pass playtime reader with a full localconfig.vdf parse '''
+    localconfig = generate_localconfig(10000)
+    with tempfile.NamedTemporaryFile("w", suffix=".vdf", delete=False, encoding="utf-8") as f:
+        f.write(localconfig)
+        path = f.name
+    apps_path = ("UserLocalConfigStore", "Software", "Valve", "Steam", "apps")
+    def full_parse():
+        with open(path, 'r', encoding='utf-8') as vdf_file:
+            apps = text_vdf_parser.loads(vdf_file.read())
+        for key in apps_path:
+            apps = apps[key]
+        return {appid : {"LastPlayed" : int(app["LastPlayed"]), "Playtime" : int(app["Playtime"])}
+                for appid, app in apps.items()}
+    cache_path = f"{path}.json"
+    def restart():
+        # a new process only loads the parsed playtime from scan_cache.json
+        return ScanCache(cache_path).parse(path, playtime.read_playtime)
+    try:
+        assert playtime.read_playtime(path) == full_parse(), "playtime differs"
+        benchmark("full parse playtime", full_parse)
+        benchmark("single pass playtime", playtime.read_playtime, path)
+        cache = ScanCache(cache_path)
+        cache.parse(path, playtime.read_playtime)
+        cache.save()
+        assert restart() == full_parse(), "cached playtime differs"
+        benchmark("cached playtime after restart", restart)
+    finally:
+        os.remove(path)
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+
+def generate_titles(count: int) -> dict:
+    ''' generates a library with count entries made of common title words '''
+    words = ["super", "mario", "zelda", "legend", "dark", "souls", "hollow", "knight",
+             "final", "fantasy", "dragon", "quest", "hades", "portal", "half", "life",
+             "grand", "theft", "auto", "street", "fighter", "sonic", "metroid", "kirby"]
+    generator = random.Random(1)
+    games = {}
+    for index in range(count):
+        title = generator.choices(words, k=generator.randint(1, 4))
+        games[str(index)] = {"AppName" : " ".join(title).title() + f" {index % 97}"}
+    return games
+
+def benchmark_search_index():
+    ''' measures trigram index build, incremental update and query times '''
+    games = generate_titles(10000)
+    index = SearchIndex()
+    benchmark("search index build (10000 titles)", index.sync, games, rounds=1)
+    for term in ["hol", "hollow kni", "holow knigt", "z"]:
+        assert index.search(term, 5, games), f"no results for {term}"
+        benchmark(f"search '{term}'", index.search, term, 5, games)
+    updated = dict(games)
+    updated["0"] = {"AppName" : "Hollow Knight: Silksong"}
+    benchmark("search index update (1 title)", index.sync, updated, rounds=1)
+    assert index.search("silksnog", 1, updated)[0][0] == "0", "typo not matched"
+
+class StandInSGDB(BaseHTTPRequestHandler):
+    ''' minimal local SteamGridDB api, answers every game with one image of each type '''
+    protocol_version = "HTTP/1.1"
+    # headers and body are separate writes, delayed acks would stall keep-alive clients
+    disable_nagle_algorithm = True
+    connections = 0
+    requests = 0
+    throttled = set()
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StandInSGDB.lock:
+            StandInSGDB.connections += 1
+
+    def send_body(self, body: bytes, status: int = 200, headers: dict = None) -> None:
+        ''' sends a response that keeps the connection alive '''
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):#pylint: disable=C0103
+        ''' serves api and image requests '''
+        host, port = self.server.server_address
+        path = self.path.split("?")[0]
+        with StandInSGDB.lock:
+            StandInSGDB.requests += 1
+        if path.startswith("/throttled/"):
+            with StandInSGDB.lock:
+                first = path not in StandInSGDB.throttled
+                StandInSGDB.throttled.add(path)
+            if first:
+                self.send_body(b"", 429, {"Retry-After" : "0"})
+                return
+            self.send_body(b"OK")
+        elif path.startswith("/images/"):
+            self.send_body(bytes(4096))
+        elif path.startswith("/games/"):
+            game_id = path.rsplit("/", 1)[1]
+            self.send_body(json.dumps({"success" : True, "data" : {"id" : game_id}}).encode())
+        elif path.startswith(("/grids/", "/heroes/", "/logos/")):
+            game_id = path.rsplit("/", 1)[1]
+            extension = "jpg" if path.startswith("/grids/") else "png"
+            url = f"http://{host}:{port}/images/{path.split('/')[1]}/{game_id}.{extension}"
+            self.send_body(json.dumps({"success" : True, "data" : [{"url" : url}]}).encode())
+        else:
+            self.send_body(b"", 404)
+
+    def log_message(self, format, *args):#pylint: disable=W0622
+        pass
+
+def benchmark_sgdb_client():
+    ''' measures artwork downloads against a local stand-in SteamGridDB server '''
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInSGDB)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    api_url = grid_db.API_URL
+    grid_db.API_URL = f"http://{host}:{port}/"
+    session = http_session.create_session()
+    assert session.get(f"{grid_db.API_URL}throttled/1", timeout=5).status_code == 200, \
+        "429 was not retried"
+    count = 300
+    output_dir = tempfile.TemporaryDirectory(prefix="mukkuru-")
+    output = output_dir.name
+    def fetch(app_id: int):
+        identifier = grid_db.GameIdentifier(f"Game {app_id}", str(app_id), "steam")
+        for image_format in ("1:1", "hero", "logo"):
+            path = os.path.join(output, f"{app_id}_{image_format.replace(':', '')}.jpg")
+            grid_db.download_image(identifier, path, image_format)
+    def scan(label: str):
+        StandInSGDB.connections = 0
+        StandInSGDB.requests = 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(fetch, range(count)))
+        elapsed = time.perf_counter() - start
+        print(f"{label}: {count / elapsed:.1f} games/s, "
+              f"{StandInSGDB.connections} connections for {StandInSGDB.requests} requests")
+    get_session = grid_db.get_session
+    id_cache = grid_db.sgdb_id_cache
+    try:
+        # requests.get opens a new connection for every request
+        grid_db.get_session = lambda: requests
+        bootstrap.get_session = lambda: requests
+        grid_db.sgdb_id_cache = SgdbIdCache(os.path.join(output, "requests_ids.json"))
+        scan("artwork scan (requests.get)")
+        grid_db.get_session = lambda: session
+        bootstrap.get_session = lambda: session
+        grid_db.sgdb_id_cache = SgdbIdCache(os.path.join(output, "session_ids.json"))
+        scan("artwork scan (shared session)")
+        # a later scan, or a restart, reuses every id
+        grid_db.sgdb_id_cache.save()
+        grid_db.sgdb_id_cache = SgdbIdCache(os.path.join(output, "session_ids.json"))
+        scan("artwork rescan (cached ids)")
+    finally:
+        grid_db.get_session = get_session
+        bootstrap.get_session = get_session
+        grid_db.sgdb_id_cache = id_cache
+        grid_db.API_URL = api_url
+        server.shutdown()
+        server.server_close()
+        output_dir.cleanup()
+
+def write_test_image(path: str, size: tuple, seed: int) -> None:
+    ''' writes a noisy png, close to artwork in how well it compresses '''
+    from PIL import Image#pylint: disable=C0415
+    generator = random.Random(seed)
+    noise = Image.frombytes("L", (size[0] // 8, size[1] // 8),
+                            bytes(generator.getrandbits(8) for _ in range(size[0] * size[1] // 64)))
+    gradient = Image.linear_gradient("L").resize(size)
+    Image.merge("RGB", (noise.resize(size), gradient, gradient.transpose(0))).save(path)
+
+def benchmark_image_variants():
+    ''' measures variant rendering and how much cheaper variants are to decode '''
+    from PIL import Image#pylint: disable=C0415
+    root = mukkuru_env.get("root")
+    temp_root = tempfile.TemporaryDirectory(prefix="mukkuru-")
+    mukkuru_env["root"] = temp_root.name
+    try:
+        os.makedirs(os.path.join(mukkuru_env["root"], "thumbnails"))
+        os.makedirs(os.path.join(mukkuru_env["root"], "hero"))
+        count = 24
+        downloads = []
+        for index in range(count):
+            grid = asset_path(str(index), "Thumbnail").replace(".jpg", ".png")
+            write_test_image(grid, (1024, 1024), index)
+            hero = asset_path(str(index), "HeroArt")
+            write_test_image(hero, (3840, 1240), index)
+            downloads += [(str(index), "Thumbnail", grid), (str(index), "HeroArt", hero)]
+        pipeline = ImagePipeline()
+        pipeline.start()
+        # the first task also pays for starting the worker processes
+        pipeline.process(*downloads.pop())
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            assert all(executor.map(lambda download: pipeline.process(*download), downloads))
+        elapsed = time.perf_counter() - start
+        print(f"render variants: {len(downloads) / elapsed:.1f} assets/s")
+        def decode(path: str):
+            with Image.open(path) as image:
+                image.load()
+        for label, flag, variant in (("grid", "Thumbnail", "tile"), ("hero", "HeroArt", "screen")):
+            original = asset_path("0", flag)
+            smallest = variant_path("0", flag, variant, "webp")
+            print(f"{label}: {os.path.getsize(original) // 1024} KiB original, "
+                  f"{os.path.getsize(smallest) // 1024} KiB {variant} webp")
+            benchmark(f"decode {label} original", decode, original)
+            benchmark(f"decode {label} {variant} webp", decode, smallest)
+        pipeline.executor.shutdown()
+    finally:
+        mukkuru_env["root"] = root
+        temp_root.cleanup()
+
+def run_benchmarks():
+    ''' run performance benchmarks '''
+    benchmark_text_vdf()
+    benchmark_binary_vdf()
+    benchmark_shortcut_iterator()
+    benchmark_binary_vdf_writer()
+    benchmark_localconfig_patch()
+    benchmark_playtime()
+    benchmark_search_index()
+    benchmark_sgdb_client()
+    benchmark_image_variants()
+
 def run_tests():
     ''' run multiple tests '''
+    test_binary_vdf_roundtrip()
+    test_text_vdf_conditionals()
+    test_jobs()
     steam.set_launch_options(None, "377670", "~/lsfg %command%")
     steam.set_launch_options(None, "345610", "~/lsfg %command%")
     steam.set_shortcut_launch_options(None, "13667182077366239232", "~/lsfg %command%")
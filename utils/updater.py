@@ -13,6 +13,7 @@ import requests
 from utils.core import format_executable, APP_VERSION, mukkuru_env, COMPILER_FLAG
 from utils.core import backend_log, sanitized_env
 from utils import bootstrap, expansion
+from utils.json_store import flush_stores
 
 REPO_URL = "https://api.github.com/repos/b1on1cdog/Mukkuru/releases"
 
@@ -27,12 +28,15 @@ def process_update() -> None:
     os.chmod(executable, current_permissions | stat.S_IXUSR)
     os.environ.pop("MUKKURU_UPDATE")
     subprocess.Popen([executable])
+    flush_stores()
     os._exit(0)
 
 def start_update(update_path) -> None:
     ''' Windows/Linux: replaces current executable with new one
         MacOS: opens new dmg and terminates current app
     '''
+    # os._exit skips cleanup, pending writes are saved first
+    flush_stores()
     if platform.system() == "Darwin":
         subprocess.run(["open", update_path], check=False)
         os._exit(0)
@@ -11,6 +11,7 @@ import time
 import glob
 from urllib.parse import urlparse
 from utils.core import sanitized_env, backend_log
+from utils.json_store import flush_stores
 
 BROWSER_PROCESS = None
 
@@ -182,4 +183,5 @@ class Frontend:
                 BROWSER_PROCESS.kill()
             shutil.rmtree(self.profile_dir)
         if should_kill:
+            flush_stores()
             os._exit(0)